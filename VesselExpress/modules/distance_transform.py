@@ -0,0 +1,177 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy import ndimage
+
+"""
+euclidean distance transform engine for the radius calculation of the graph analysis
+the transform at the skeleton voxels is computed in one of the following modes:
+exact    - transform of the whole image with scipy.ndimage
+tiled    - the coordinates are grouped into tiles which are computed in parallel threads, every tile is padded by an
+           overlap covering the maximum expected radius, so larger distances may be overestimated
+two_pass - like tiled, but every tile containing a distance larger than its overlap is computed a second time
+           with an overlap covering that distance, the result is identical to the exact transform
+"""
+
+EDT_MODES = ('exact', 'tiled', 'two_pass')
+
+
+def get_overlap(radius, sampling):
+    """
+    Return the number of voxels/pixels along each axis which cover a distance of radius
+    Parameters
+    ----------
+    radius : float
+        distance in the unit of the pixel dimensions
+
+    sampling : list
+        pixel dimensions 3D: [z, y, x]   2D: [y, x]
+
+    Returns
+    -------
+    overlap : numpy array
+        number of voxels/pixels for each axis
+    """
+    return np.array([max(1, int(math.ceil(radius / s))) for s in sampling])
+
+
+def _get_slices(start, stop):
+    return tuple(slice(a, b) for a, b in zip(start, stop))
+
+
+def _map(function, items, workers):
+    if workers > 1:
+        with ThreadPoolExecutor(workers) as executor:
+            list(executor.map(function, items))
+    else:
+        for item in items:
+            function(item)
+
+
+def _transform_box(image, lower, upper, sampling, max_radius, exact, points):
+    """
+    Return the distance transform at points inside of the box [lower, upper) of an image, computed on the box
+    padded by the overlap of max_radius
+    Parameters
+    ----------
+    image : numpy array
+        binary image
+
+    lower, upper : numpy array
+        corners of the box
+
+    sampling : list
+        pixel dimensions
+
+    max_radius : float
+        maximum expected distance
+
+    exact : bool
+        if True the box is computed again with a larger overlap if it contains a distance larger than the overlap
+
+    points : numpy array
+        (N, ndim) coordinates inside of the box, only the distances at these coordinates are returned and checked
+
+    Returns
+    -------
+    distances : numpy array
+        distances at the points
+    """
+    shape = np.array(image.shape)
+    while True:
+        overlap = get_overlap(max_radius, sampling)
+        start = np.maximum(lower - overlap, 0)
+        stop = np.minimum(upper + overlap, shape)
+        box = image[_get_slices(start, stop)]
+        covers_image = np.all(start == 0) and np.all(stop == shape)
+        if not covers_image and np.all(box):
+            # without any background in the box there are no distances to compute, pad it further
+            max_radius = 2 * max(max_radius, max(sampling))
+            continue
+        distances = ndimage.distance_transform_edt(box, sampling=sampling)[tuple((points - start).T)]
+        max_distance = distances.max() if distances.size else 0
+        # a distance covered by the overlap is exact since its closest background point lies inside of the padded box
+        if not exact or covers_image or max_distance <= min(overlap * sampling):
+            return distances
+        max_radius = max_distance
+
+
+def distance_transform_edt(image, sampling, dtype=np.float32):
+    """
+    Return the exact euclidean distance transform of a binary image
+    Parameters
+    ----------
+    image : numpy array
+        binary 2D or 3D image
+
+    sampling : list
+        pixel dimensions 3D: [z, y, x]   2D: [y, x]
+
+    dtype : numpy dtype
+        data type of the returned distances, float32 halves the memory of the default float64 transform
+
+    Returns
+    -------
+    distances : numpy array
+        distance of every voxel/pixel to its closest background voxel/pixel
+    """
+    sampling = np.asarray(sampling, dtype=float)
+    return ndimage.distance_transform_edt(image, sampling=sampling).astype(dtype, copy=False)
+
+
+def distance_transform_at(image, coordinates, sampling, mode='two_pass', max_radius=15, tile_size=128, workers=1):
+    """
+    Return the euclidean distance transform of a binary image at the given coordinates
+    Parameters
+    ----------
+    image : numpy array
+        binary 2D or 3D image
+
+    coordinates : numpy array
+        (N, ndim) array of coordinates
+
+    sampling : list
+        pixel dimensions 3D: [z, y, x]   2D: [y, x]
+
+    mode : string
+        'exact', 'tiled' or 'two_pass'
+
+    max_radius : float
+        maximum expected radius in the unit of the pixel dimensions, determines the padding of the tiles
+
+    tile_size : int
+        edge length of the tiles the coordinates are grouped in
+
+    workers : int
+        number of threads computing tiles in parallel
+
+    Returns
+    -------
+    distances : numpy array
+        float32 array of the distances at the coordinates
+
+    Notes
+    ------
+    In the tiled modes the transform of a tile is only computed in the bounding box of its coordinates padded by the
+    overlap, so the computation scales with the number of coordinates instead of the size of the image.
+    """
+    assert mode in EDT_MODES, "unknown distance transform mode " + str(mode)
+    sampling = np.asarray(sampling, dtype=float)
+    distances = np.empty(len(coordinates), dtype=np.float32)
+    if len(coordinates) == 0:
+        return distances
+    if mode == 'exact':
+        distances[:] = ndimage.distance_transform_edt(image, sampling=sampling)[tuple(coordinates.T)]
+        return distances
+    shape = np.array(image.shape)
+    tile_ids = np.ravel_multi_index((coordinates // tile_size).T, tuple(-(-shape // tile_size)))
+    order = np.argsort(tile_ids, kind='stable')
+
+    def compute_tile(group):
+        points = coordinates[group]
+        distances[group] = _transform_box(image, points.min(axis=0), points.max(axis=0) + 1, sampling, max_radius,
+                                          mode == 'two_pass', points)
+
+    _map(compute_tile, np.split(order, np.flatnonzero(np.diff(tile_ids[order])) + 1), workers)
+    return distances
@@ -1,13 +1,9 @@
 import numpy as np
 import time
 from collections import defaultdict
-import dask.array as da
-import os
-import math
-from scipy import interpolate
-from geomdl import knotvector
 
 import measurements as ms
+import spline_interpolation as si
 
 
 class Filament:
@@ -16,27 +12,30 @@ class Filament:
 
         Parameters
         ----------
-        graph : dictionary of lists (adjacency list) with key as node and value = list with its neighboring nodes
+        graph : SkeletonGraph of a single connected component, edges are removed in place during postprocessing
 
-        start : list of coordinates
-            beginning point for DFS (must be an end point)
-            3D: [z, y, x]   2D: [y, x]
+        start : int
+            node id of the beginning point for DFS (must be an end point)
 
-        skelRadii : array containing the distance to the closest background point (=radius)
+        skelRadii : float32 array containing the distance to the closest background point (=radius) of each node
 
         pixelDimensions : list of pixel dimensions [z, y, x]
 
         lengthLimit : float
             minimum length (all branches below this length will be removed)
 
+        radiusMatrix : SparseRadiusMatrix, optional
+            radii at the skeleton voxel coordinates, used for the volume of interpolated segments in small RAM mode
+
         Examples
         --------
-        Filament.endPtsList - A list containing all nodes with only one other node connected to them
+        Filament.endPtsList - A list containing the coordinates of all nodes with only one other node connected to them
 
-        Filament.branchPtsList - A list containing all nodes with more than 2 nodes connected to them
+        Filament.brPtsDict - A dictionary with the coordinates of all nodes with more than 2 nodes connected to them
+            as key and their number of neighbors as value
 
         Filament.segmentsDict - A dictionary containing all segments (path from branch/end point to branch/end point)
-            with key as segment index (start node, end node) and value = list of nodes in segment
+            with key as segment index (start node, end node) and value = array of node coordinates in segment
 
         Filament.lengthDict - A dictionary with key as segment index (start node, end node) and
             value = length of the segment
@@ -56,13 +55,17 @@ class Filament:
         Notes
         --------
         straightness = curveDisplacement / curveLength
+
+        Internally all nodes are node ids of the graph, the dictionaries and lists above are converted to
+        coordinate tuples after the DFS and postprocessing are finished.
         """
     def __init__(self, graph, start, skelRadii, pixelDimensions, lengthLimit, diaScale, branchingThreshold, expFlag,
                  smallRAMmode, fileName, removeBorderEndPts, removeEndPtsFromSmallFilaments, interpolate, splineDegree,
-                 cut_neighbor_brpt_segs):
+                 cut_neighbor_brpt_segs, radiusMatrix=None):
         self.graph = graph
         self.start = start
         self.skelRadii = skelRadii
+        self.radiusMatrix = radiusMatrix
         self.pixelDims = pixelDimensions
         self.lengthLim = lengthLimit
         self.diaScale = diaScale
@@ -79,6 +82,14 @@ class Filament:
         self.brPtsDict = {}
         self.segmentsDict = {}
         self._predDict = {}
+        # indexes for the postprocessing: end points as ordered set, id of each segment key in the order the
+        # segments were added and the keys of the segments starting or ending at each node
+        self._endPts = {}
+        self._segmentIds = {}
+        self._numSegmentIds = 0
+        self._incidentSegments = defaultdict(set)
+        # vector of the segment leading to a branch point for the branching angles of merged segments
+        self._predVectors = {}
         self.compTime = 0
         self.postprocessTime = 0
         self.postprocBranches = 0
@@ -88,43 +99,21 @@ class Filament:
 
     def dfs_iterative(self):
         """
-            Iterate over the graph in a depth-first-search. If a branch or end point is found, retrieve the segment
-            and calculate its statistics
+            Split the graph into its segments in a depth-first-search and calculate their statistics
         """
         startTime = time.time()
-        visited, stack = set(), [self.start]
-        while stack:
-            vertex = stack.pop()
-            if vertex not in visited:
-                visited.add(vertex)
-                for neighbor in self.graph[vertex]:
-                    if neighbor not in visited:
-                        self._predDict[neighbor] = vertex
-                        stack.append(neighbor)
-                    elif neighbor in visited and not self._predDict[vertex] == neighbor:  # cycle found
-                        if len(self.graph[neighbor]) > 2:  # neighbor is branch point
-                            oldPred = self._predDict[neighbor]
-                            self._predDict[neighbor] = vertex   # change predecessor to get segment of cycle
-                            segment = self._getSegment(neighbor)
-                            self._predDict[neighbor] = oldPred  # change back to old predecessor
-                            self._setSegStats(segment, interpolate=self.interpolate)
-                if len(self.graph[vertex]) == 1:    # end point found
-                    self.endPtsList.append(vertex)
-                    if vertex != self.start:
-                        segment = self._getSegment(vertex)
-                        self._setSegStats(segment, interpolate=self.interpolate)
-                elif len(self.graph[vertex]) > 2:   # branch point found
-                    self.brPtsDict[vertex] = len(self.graph[vertex])
-                    segment = self._getSegment(vertex)
-                    self._setSegStats(segment, interpolate=self.interpolate)
+        segmentNodes, segmentOffsets, predSegments = self._decomposeChains()
+        self._setSegmentsStats(segmentNodes, segmentOffsets, predSegments, interpolate=self.interpolate)
         self.compTime = time.time() - startTime
 
         # postprocessing
         postprocStart = time.time()
+        self._endPts = dict.fromkeys(self.endPtsList)
         self._removeSmallAndSegmentsBelowDiameterLengthRatio(self.cut_neighbor_brpt_segs)
 
         if self.removeBorderEndPts == 1:
             self._removeBorderPtsFromEndPts()   # remove image border points from end points list
+        self.endPtsList = list(self._endPts)
 
         if self.removeEndPtsFromSmallFilaments == 1:
             if len(self.segmentsDict) < 5:
@@ -135,56 +124,118 @@ class Filament:
         self.postprocessTime = time.time() - postprocStart
 
         # add number of terminal and branch points to segments dictionary
+        endPts = set(self.endPtsList)
         for seg in self.segmentStats:
             self.segmentStats[seg]['terminal Points'] = 0
             self.segmentStats[seg]['branching Points'] = 0
-            if seg[0] in self.endPtsList:
+            if seg[0] in endPts:
                 self.segmentStats[seg]['terminal Points'] += 1
             if seg[0] in self.brPtsDict.keys():
                 self.segmentStats[seg]['branching Points'] += 1
-            if seg[1] in self.endPtsList:
+            if seg[1] in endPts:
                 self.segmentStats[seg]['terminal Points'] += 1
             if seg[1] in self.brPtsDict.keys():
                 self.segmentStats[seg]['branching Points'] += 1
 
-    # Segment interpolation functions copied from
-    # https://github.com/JacobBumgarner/VesselVio/blob/main/library/feature_extraction.py
-    # and adjusted degree settings
-    # Build interpolation delta
-    def _delta_calc(self, num_verts, vis_radius):
-        # base = 3 if num_verts > 50 else 2
-        delta = max(3, math.ceil(num_verts / math.log(num_verts, 2)))
-        if num_verts > 100 or (vis_radius > 3 and num_verts > 20):
-            delta = int(delta / 2)
-        return delta
-
-    def _seg_interpolate(self, point_coords, vis_radius, spline_deg=3):
-        # Find basis-spline (BSpline) of points to smooth jaggedness of skeleton.
-        # The resources I used to learn about BSplines can be examined below:
-        # https://web.mit.edu/hyperbook/Patrikalakis-Maekawa-Cho/node17.html
-        # http://learnwebgl.brown37.net/07_cameras/points_along_a_path.html
-        # http://www.independent-software.com/determining-coordinates-on-a-html-canvas-bezier-curve.html
-
-        # Set appropriate degree of our BSpline
-        num_verts = point_coords.shape[0]
-        if num_verts > spline_deg + 1:
-            spline_degree = spline_deg
-        else:
-            spline_degree = max(1, num_verts - 1)
-
-        # The optimal number of interpolated segment points for visualization was determined emperically as a trade-off value between ground-truth length and computational costs.
-        delta = self._delta_calc(num_verts, vis_radius)
-
-        # Find the segment length based on our cubic BSpline.
-        # https://github.com/kawache/Python-B-spline-examples
-        u = np.linspace(0, 1, delta, endpoint=True)  # U
-
-        # Scipy knot vector format
-        knots = knotvector.generate(spline_degree, num_verts)  # Knotvector
-        tck = [knots, [point_coords[:, 0], point_coords[:, 1], point_coords[:, 2]], spline_degree]
-
-        coords_list = np.array(interpolate.splev(u, tck)).T
-        return coords_list
+        self._setCoordinateKeys()
+
+    def _setCoordinateKeys(self):
+        """
+            Replaces the node ids in keys and values of the filament dictionaries and lists by coordinate tuples
+        """
+        self._endPts, self._segmentIds, self._incidentSegments = {}, {}, defaultdict(set)
+        self._predVectors = {}
+        coordinates = self.graph.coordinates
+        nodeTuple = self.graph.node_tuple
+        self.segmentsDict = {(nodeTuple(k[0]), nodeTuple(k[1])): coordinates[v] for k, v in self.segmentsDict.items()}
+        self.segmentStats = defaultdict(dict, {(nodeTuple(k[0]), nodeTuple(k[1])): v
+                                               for k, v in self.segmentStats.items()})
+        self.brPtsDict = {nodeTuple(k): v for k, v in self.brPtsDict.items()}
+        self.endPtsList = [nodeTuple(k) for k in self.endPtsList]
+
+    def _decomposeChains(self):
+        """
+            Splits the graph into chains between nodes of degree != 2 in a single depth-first-search. If a branch or
+            end point is found, its segment is the chain to the closest branch or end point visited before.
+            If an edge to an already visited branch point closes a cycle, the chain to this edge is a segment too.
+
+            Returns
+            -------
+            segmentNodes : numpy array
+                flat array of the node ids of all segments in the order they were found
+
+            segmentOffsets : numpy array
+                segment i consists of segmentNodes[segmentOffsets[i]:segmentOffsets[i + 1]]
+
+            predSegments : numpy array
+                index of the segment ending at the first node of each segment, -1 if there is none
+
+            Notes
+            --------
+            A node of degree 2 has at most one unvisited neighbor, which is popped right after it. So the nodes
+            between two branch or end points are visited consecutively and every segment is a slice of the
+            visiting order between its first and last node.
+        """
+        degree = self.graph.degree
+        numNodes = len(self.graph)
+        visitOrder = []
+        # position of a node in the chain below its closest branch or end point visited before, -1 for these points
+        chainPos = np.full(numNodes, -1, dtype=np.int64)
+        chainHead = np.arange(numNodes)
+        segmentTails, segmentEnds, isTreeSegment = [], [], []
+        visited, stack = set(), [self.start]
+        while stack:
+            vertex = stack.pop()
+            if vertex not in visited:
+                visited.add(vertex)
+                if vertex != self.start and degree[vertex] == 2:
+                    pred = self._predDict[vertex]
+                    chainPos[vertex] = chainPos[pred] + 1
+                    chainHead[vertex] = chainHead[pred]
+                visitOrder.append(vertex)
+                for neighbor in self.graph.neighbors(vertex).tolist():
+                    if neighbor not in visited:
+                        self._predDict[neighbor] = vertex
+                        stack.append(neighbor)
+                    elif neighbor in visited and not self._predDict[vertex] == neighbor:  # cycle found
+                        if degree[neighbor] > 2:  # neighbor is branch point
+                            segmentTails.append(vertex)
+                            segmentEnds.append(neighbor)
+                            isTreeSegment.append(False)
+                if degree[vertex] == 1:    # end point found
+                    self.endPtsList.append(vertex)
+                    if vertex != self.start:
+                        segmentTails.append(self._predDict[vertex])
+                        segmentEnds.append(vertex)
+                        isTreeSegment.append(True)
+                elif degree[vertex] > 2:   # branch point found
+                    self.brPtsDict[vertex] = int(degree[vertex])
+                    segmentTails.append(self._predDict[vertex])
+                    segmentEnds.append(vertex)
+                    isTreeSegment.append(True)
+
+        # a segment consists of the chain head of its tail, the chain from the head to the tail and its end
+        visitOrder = np.array(visitOrder, dtype=np.int64)
+        visitIndex = np.empty(numNodes, dtype=np.int64)
+        visitIndex[visitOrder] = np.arange(len(visitOrder))
+        segmentTails = np.array(segmentTails, dtype=np.int64)
+        segmentEnds = np.array(segmentEnds, dtype=np.int64)
+        chainLengths = chainPos[segmentTails] + 1
+        segmentOffsets = np.zeros(len(segmentTails) + 1, dtype=np.int64)
+        np.cumsum(chainLengths + 2, out=segmentOffsets[1:])
+        segmentNodes = np.empty(segmentOffsets[-1], dtype=np.int64)
+        segmentNodes[segmentOffsets[:-1]] = chainHead[segmentTails]
+        segmentNodes[segmentOffsets[1:] - 1] = segmentEnds
+        chainStarts = np.cumsum(chainLengths) - chainLengths
+        withinChain = np.arange(chainLengths.sum()) - np.repeat(chainStarts, chainLengths)
+        segmentNodes[np.repeat(segmentOffsets[:-1] + 1, chainLengths) + withinChain] = \
+            visitOrder[np.repeat(visitIndex[segmentTails] - chainLengths + 1, chainLengths) + withinChain]
+
+        # the segment leading to a branch point is the segment found when the branch point was visited
+        treeSegmentOf = np.full(numNodes, -1, dtype=np.int64)
+        treeSegmentOf[segmentEnds[np.array(isTreeSegment, dtype=bool)]] = np.flatnonzero(isTreeSegment)
+        predSegments = treeSegmentOf[segmentNodes[segmentOffsets[:-1]]]
+        return segmentNodes, segmentOffsets, predSegments
 
     def _getSegment(self, node):
         """
@@ -192,201 +243,184 @@ class Filament:
 
             Parameters
             ----------
-            node : list of node coordinates
-                3D: [z, y, x]   2D: [y, x]
+            node : int
+                node id of the branch or end node in the filament graph
 
             Returns
             -------
-            segmentList : list of nodes in the segment
+            segmentList : list of node ids in the segment, None if a predecessor is missing
         """
         segmentList = [node]
         while True:
             node = self._predDict.get(node)
             if node is None:  # may happen due to postprocessing removing predecessors of old branching points
                 return None
-            segmentList.insert(0, node)
-            if len(self.graph[node]) == 1 or len(self.graph[node]) > 2:
+            segmentList.append(node)
+            if self.graph.degree[node] == 1 or self.graph.degree[node] > 2:
                 break
+        segmentList.reverse()
         return segmentList
 
-    def _getBranchingDegree(self, segment, factor=0.25):
+    def _getPredecessorVector(self, node):
         """
-            Calculates the branching degree of a segment
-
-            Parameters
-            ----------
-            segment : list
-                list of nodes in the segment
-
-            factor : float
-                length factor used for calculating the vectors of the segments
-
-            Returns
-            -------
-            degree : float
-                degree between the vectors of the segment and it's predecessor
+            Returns the vector of the segment leading to a branch point for the branching angle, None if the
+            segment can not be found. The vector is cached for all segments starting at the branch point.
         """
-        segPredList = self._getSegment(segment[0])
-        if segPredList is None:
-            return "Null"
-        segPredList.reverse()
-        # take neighboring points from branching point
-        if factor <= 0:
-            segPredPt = segPredList[1]
-            segPt = segment[1]
-        # take half of the segments from branching point
-        elif factor == 0.5:
-            segPredPt = segPredList[int(len(segPredList) * factor)]
-            segPt = segment[int(len(segment) * factor)]
-        # take the whole segment from branching point
-        elif factor >= 1:
-            segPredPt = segPredList[len(segPredList)-1]
-            if segment[len(segment) - 1] == segment[0]:     # in case of a circle, take pre-last point
-                segPt = segment[len(segment) - 2]
-            else:
-                segPt = segment[len(segment) - 1]
-        # take points according to the factor of the segment lengths
-        else:
-            # determine point of predecessor
-            if round(len(segPredList) * factor) == 0 or len(segPredList) == 2:
-                segPredPt = segPredList[1]
+        if node not in self._predVectors:
+            segPredList = self._getSegment(node)
+            if segPredList is None:
+                self._predVectors[node] = None
             else:
-                segPredPt = segPredList[round(len(segPredList) * factor)]
-            # determine point of segment
-            if round(len(segment) * factor) == 0 or len(segment) == 2:
-                segPt = segment[1]
-            else:
-                if segment[round(len(segment) * factor)] == segment[0]:  # in case of a circle, take pre-last point
-                    segPt = segment[len(segment) - 2]
-                else:
-                    segPt = segment[round(len(segment) * factor)]
-        segPredVect = [j - i for i, j in zip(segPredPt, segment[0])]
-        segPredVect = [a * b for a, b in zip(segPredVect, self.pixelDims)]
-        segVect = [j - i for i, j in zip(segment[0], segPt)]
-        segVect = [a * b for a, b in zip(segVect, self.pixelDims)]
-
-        cosine_angle = np.dot(segPredVect, segVect) / (np.linalg.norm(segPredVect) * np.linalg.norm(segVect))
-        angle = np.arccos(round(cosine_angle, 4))
-
-        return round(np.degrees(angle), 4)
+                self._predVectors[node] = ms.getPredecessorVectors(self.graph.coordinates[segPredList],
+                                                                   np.array([0, len(segPredList)]), self.pixelDims,
+                                                                   self.branchingThr)
+        return self._predVectors[node]
 
     def _setSegStats(self, segment, interpolate):
         """
-            Sets the statistics for a segment
+            Sets the statistics for a segment, the segment leading to its first node is found by iterating over
+            the predecessors
 
             Parameters
             ----------
             segment : list
-                list of nodes in the segment
+                list of node ids in the segment
         """
-        self.segmentsDict[segment[0], segment[len(segment) - 1]] = segment
-        if self.smallRAMmode == 1:
-            radius = ms.getRadius(da.from_zarr('tmp_zarr' + os.sep + self.fileName + '_radiusMatrix.zarr'), segment, 1)
-        else:
-            radius = ms.getRadius(self.skelRadii, segment)
+        predVector = self._getPredecessorVector(segment[0])
+        self._setSegmentsStats(np.array(segment), np.array([0, len(segment)]),
+                               np.array([-1 if predVector is None else 0]), interpolate, predVectors=predVector)
 
-        if interpolate:
-            coords = self._seg_interpolate(np.asarray(segment), radius, self.splineDegree)
-        else:
-            coords = segment
+    def _setSegmentsStats(self, segmentNodes, segmentOffsets, predSegments, interpolate, predVectors=None):
+        """
+            Sets the statistics for segments given as one flat array
+
+            Parameters
+            ----------
+            segmentNodes : numpy array
+                flat array of the node ids of all segments
 
-        # calculate straightness
-        vect = [j - i for i, j in zip(coords[0], coords[len(coords) - 1])]
-        vect = [a * b for a, b in zip(vect, self.pixelDims)]  # multiply pixel length with pixel dimension
-        curveDisplacement = np.linalg.norm(vect)
+            segmentOffsets : numpy array
+                segment i consists of segmentNodes[segmentOffsets[i]:segmentOffsets[i + 1]]
 
-        # calculate segment length
-        segLength = ms.getLength(coords, self.pixelDims)
+            predSegments : numpy array
+                index of the segment leading to the first node of each segment, -1 if there is none
 
-        #calculate segment volume
+            predVectors : numpy array, optional
+                vectors of the predecessors indexed by predSegments instead of the segments themselves
+        """
+        numSegments = len(segmentOffsets) - 1
+        if numSegments == 0:
+            return
+        coords = self.graph.coordinates[segmentNodes]
+        radii = ms.getMeanRadii(self.skelRadii[segmentNodes], segmentOffsets)
+
+        curveCoords, curveOffsets, radiusMatrix = None, None, None
         if interpolate:
+            curveCoords, curveOffsets = si.interpolate_segments(coords, segmentOffsets, radii, self.splineDegree)
             if self.smallRAMmode == 1:
-                volume = ms.getVolume(da.from_zarr('tmp_zarr' + os.sep + self.fileName + '_radiusMatrix.zarr'),
-                                      coords, self.pixelDims).compute()
-            else:
-                #volume = ms.getVolume(self.skelRadii, coords, self.pixelDims)
-                volume = ms.getVolumeCylinder(radius, segLength)
-        else:
-            volume = ms.getVolumeCylinder(radius, segLength)
-
-        # calculate branching degree
-        branchingDegree = self._getBranchingDegree(segment, self.branchingThr)
+                radiusMatrix = self.radiusMatrix
+        stats = ms.getSegmentStats(coords, segmentOffsets, radii, self.pixelDims, predSegments, self.branchingThr,
+                                   curveCoords, curveOffsets, radiusMatrix, predVectors)
+        if self.expFlag == 1:
+            stats['zAngle'] = ms.get_z_angles(coords, self.pixelDims, segmentOffsets)
+        columns = {name: values.tolist() for name, values in stats.items()}
 
         # fill dictionary for csv file containing all segment statistics
-        self.segmentStats[segment[0], segment[len(segment) - 1]]['diameter'] = radius * 2
-        self.segmentStats[segment[0], segment[len(segment) - 1]]['straightness'] = curveDisplacement / segLength
-        self.segmentStats[segment[0], segment[len(segment) - 1]]['length'] = segLength
-        self.segmentStats[segment[0], segment[len(segment) - 1]]['volume'] = volume
-        self.segmentStats[segment[0], segment[len(segment) - 1]]['branchingAngle'] = branchingDegree
-
-        # experimental statistics
-        if self.expFlag == 1:
-            zAngle = ms.get_z_angle(segment, self.pixelDims)
-            self.segmentStats[segment[0], segment[len(segment) - 1]]['zAngle'] = zAngle
+        for i in range(numSegments):
+            segment = segmentNodes[segmentOffsets[i]:segmentOffsets[i + 1]].tolist()
+            key = segment[0], segment[len(segment) - 1]
+            self._addSegment(key, segment)
+            segmentStats = self.segmentStats[key]
+            segmentStats['diameter'] = columns['diameter'][i]
+            segmentStats['straightness'] = columns['straightness'][i]
+            segmentStats['length'] = columns['length'][i]
+            segmentStats['volume'] = columns['volume'][i]
+            segmentStats['branchingAngle'] = "Null" if predSegments[i] < 0 else columns['branchingAngle'][i]
+
+            # experimental statistics
+            if self.expFlag == 1:
+                segmentStats['zAngle'] = columns['zAngle'][i]
 
     def _removeBorderPtsFromEndPts(self):
         """
             Removes all end points which are image border points from end points list.
         """
         endPtsToRemove = []
-        ndims = self.skelRadii.ndim
+        ndims = len(self.graph.shape)
         if ndims == 3:
-            z = self.skelRadii.shape[0]-1
-            y = self.skelRadii.shape[1]-1
-            x = self.skelRadii.shape[2]-1
-            for endPt in self.endPtsList:
+            z = self.graph.shape[0]-1
+            y = self.graph.shape[1]-1
+            x = self.graph.shape[2]-1
+            for endPtId in self._endPts:
+                endPt = self.graph.coordinates[endPtId]
                 if endPt[0] == z or endPt[1] == y or endPt[2] == x or endPt[0] == 0 or endPt[1] == 0 or endPt[2] == 0:
-                    endPtsToRemove.append(endPt)
+                    endPtsToRemove.append(endPtId)
                     self.postprocEndPts += 1
         elif ndims == 2:
-            y = self.skelRadii.shape[0] - 1
-            x = self.skelRadii.shape[1] - 1
-            for endPt in self.endPtsList:
+            y = self.graph.shape[0] - 1
+            x = self.graph.shape[1] - 1
+            for endPtId in self._endPts:
+                endPt = self.graph.coordinates[endPtId]
                 if endPt[0] == y or endPt[1] == x or endPt[0] == 0 or endPt[1] == 0:
-                    endPtsToRemove.append(endPt)
+                    endPtsToRemove.append(endPtId)
                     self.postprocEndPts += 1
         for endPt in endPtsToRemove:
-            self.endPtsList.remove(endPt)
+            del self._endPts[endPt]
+
+    def _addSegment(self, key, segment):
+        """
+            Stores a segment under its key (start node, end node) and adds new keys to the indexes
+        """
+        if key not in self._segmentIds:
+            self._segmentIds[key] = self._numSegmentIds
+            self._numSegmentIds += 1
+            self._incidentSegments[key[0]].add(key)
+            self._incidentSegments[key[1]].add(key)
+        self.segmentsDict[key] = segment
+
+    def _deleteSegment(self, key):
+        """
+            Deletes a segment and its statistics and removes its key from the indexes
+        """
+        del self.segmentsDict[key]
+        del self.segmentStats[key]
+        del self._segmentIds[key]
+        self._incidentSegments[key[0]].discard(key)
+        self._incidentSegments[key[1]].discard(key)
 
     def _deletePath(self, path):
+        self._predVectors.clear()   # removed edges change the degrees the predecessor segments are found by
         for i in range(len(path) - 1):
             self._removeEdge(path[i], path[i + 1])
 
     def _removeEdge(self, u, v):
-        self.graph.get(u).remove(v)
-        self.graph.get(v).remove(u)
+        self.graph.remove_edge(u, v)
 
     def _removeSegments(self, keys):
         brPtCandidates = set()
         for key in keys:
             self._deletePath(self.segmentsDict[key])
-            del self.segmentsDict[key]
-            del self.segmentStats[key]
-            if key[0] in self.endPtsList:
-                self.endPtsList.remove(key[0])
-            if key[1] in self.endPtsList:
-                self.endPtsList.remove(key[1])
+            self._deleteSegment(key)
+            self._endPts.pop(key[0], None)
+            self._endPts.pop(key[1], None)
             # add branch points to possible deletable candidates
             if key[0] in self.brPtsDict:
                 brPtCandidates.add(key[0])
             if key[1] in self.brPtsDict:
                 brPtCandidates.add(key[1])
         # check if branch points still remain branch points after postprocessing
-        for brPt in brPtCandidates:
+        for brPt in sorted(brPtCandidates):
             # branch point becomes normal point connecting two segments together
-            if len(self.graph[brPt]) == 2:
+            if self.graph.degree[brPt] == 2:
                 del self.brPtsDict[brPt]
-                # find both segments connected by the branch pt
-                segments = [v for k, v in self.segmentsDict.items() if k[0] == brPt or k[1] == brPt]
+                # find both segments connected by the branch pt in the order they were added
+                segKeys = sorted(self._incidentSegments[brPt], key=self._segmentIds.get)
+                segments = [self.segmentsDict[k] for k in segKeys]
                 # delete old segments from segment dictionaries (either one segment if circle otherwise 2 segments)
                 if len(segments) > 0:
-                    segKey1 = (segments[0][0], segments[0][-1])
-                    del self.segmentsDict[segKey1]
-                    del self.segmentStats[segKey1]
+                    self._deleteSegment(segKeys[0])
                     if len(segments) != 1:  # if segment is not a circle delete second segment from dictionaries
-                        segKey2 = (segments[1][0], segments[1][-1])
-                        del self.segmentsDict[segKey2]
-                        del self.segmentStats[segKey2]
+                        self._deleteSegment(segKeys[1])
                         # combine both segments to one segment and calculate its statistics
                         if segments[0][-1] == brPt and segments[1][0] == brPt:
                             combSegments = segments[0] + segments[1][1:]
@@ -399,11 +433,11 @@ class Filament:
                             combSegments = segments[0][:-1] + segments[1][::-1]
                         self._setSegStats(combSegments, interpolate=self.interpolate)
             # branch point becomes end point
-            elif len(self.graph[brPt]) == 1:
+            elif self.graph.degree[brPt] == 1:
                 del self.brPtsDict[brPt]
-                self.endPtsList.append(brPt)
+                self._endPts[brPt] = None
             # all branches of a branch point were removed => delete branch point from dict
-            elif len(self.graph[brPt]) == 0:
+            elif self.graph.degree[brPt] == 0:
                 del self.brPtsDict[brPt]
 
     def _removeSmallAndSegmentsBelowDiameterLengthRatio(self, cut_neighbor_brpt_segs):
@@ -418,14 +452,14 @@ class Filament:
         for segKey in self.segmentStats:
             if cut_neighbor_brpt_segs == 1:
                 if (self.segmentStats[segKey]['length'] < self.diaScale * self.segmentStats[segKey]['diameter']\
-                        and (segKey[0] in self.endPtsList or segKey[1] in self.endPtsList)) \
+                        and (segKey[0] in self._endPts or segKey[1] in self._endPts)) \
                         or (self.segmentStats[segKey]['length'] <= self.lengthLim):
                     keysToRemoveList.append(segKey)
             # dont cut segments which are 2 branching points with length below pixel dimension
             else:
                 if not (segKey[0] in self.brPtsDict and segKey[1] in self.brPtsDict and self.segmentStats[segKey]['length'] <= self.lengthLim):
                     if (self.segmentStats[segKey]['length'] < self.diaScale * self.segmentStats[segKey]['diameter'] \
-                        and (segKey[0] in self.endPtsList or segKey[1] in self.endPtsList)) \
+                        and (segKey[0] in self._endPts or segKey[1] in self._endPts)) \
                             or (self.segmentStats[segKey]['length'] <= self.lengthLim):
                         keysToRemoveList.append(segKey)
         self.postprocBranches = len(keysToRemoveList)
@@ -1,18 +1,157 @@
 import os
 
-import networkx as nx
 from collections import defaultdict
+import multiprocessing
 import time
 
 import numpy as np
 
 import filament as fil
-from scipy.ndimage import distance_transform_edt
 import csv
 import dask.array as da
+import zarr
 # from dask.distributed import Client
 
+import distance_transform as dt
 import measurements as ms
+import skeleton_graph as sg
+
+
+# filament parameters, radius matrix and whether the segments are returned of a worker process, set once by
+# _init_filament_worker
+_workerFilamentArgs = None
+_workerRadiusMatrix = None
+_workerKeepSegments = True
+
+
+def _init_filament_worker(filamentArgs, radiusMatrix, keepSegments):
+    global _workerFilamentArgs, _workerRadiusMatrix, _workerKeepSegments
+    _workerFilamentArgs = filamentArgs
+    _workerRadiusMatrix = radiusMatrix
+    _workerKeepSegments = keepSegments
+
+
+def _gather_chunked(array, coordinates):
+    """
+        Reads the values of a chunked (zarr) array at the given coordinates, every chunk containing
+        coordinates is read exactly once
+
+        Parameters
+        ----------
+        array : chunked array
+        coordinates : (N, ndim) array of coordinates
+
+        Returns
+        -------
+        values : float32 array
+            (N,) array of the values at the coordinates
+    """
+    values = np.empty(len(coordinates), dtype=np.float32)
+    if len(coordinates) == 0:
+        return values
+    chunks = np.array(array.chunks)
+    chunkCoordinates = coordinates // chunks
+    chunkIds = np.ravel_multi_index(chunkCoordinates.T, tuple(-(-np.array(array.shape) // chunks)))
+    order = np.argsort(chunkIds, kind='stable')
+    for group in np.split(order, np.flatnonzero(np.diff(chunkIds[order])) + 1):
+        start = chunkCoordinates[group[0]] * chunks
+        block = np.asarray(array[tuple(slice(a, a + c) for a, c in zip(start, chunks))])
+        values[group] = block[tuple((coordinates[group] - start).T)]
+    return values
+
+
+def _filament_worker(task):
+    """
+        Computes the statistics of one filament in a worker process
+
+        Parameters
+        ----------
+        task : tuple
+            (subgraph, start) with the SkeletonGraph of the filament and the node id of its first end point
+
+        Returns
+        -------
+        results : dict
+            results of the filament (see _filament_results)
+    """
+    subGraphSkeleton, start = task
+    filament = fil.Filament(subGraphSkeleton, start, subGraphSkeleton.radii, *_workerFilamentArgs,
+                            radiusMatrix=_workerRadiusMatrix)
+    filament.dfs_iterative()
+    return _filament_results(filament, _workerKeepSegments)
+
+
+def _filament_results(filament, keepSegments=True):
+    """
+        Returns the results of a processed filament which are used by Graph. The graph, radii and indexes of the
+        filament are left out, so a worker process does not send them back. The node coordinates of the segments
+        are left out too if keepSegments is False.
+    """
+    return {
+        'numSegments': len(filament.segmentsDict),
+        'segmentsDict': filament.segmentsDict if keepSegments else None,
+        'segmentStats': filament.segmentStats,
+        'brPtsDict': filament.brPtsDict,
+        'endPtsList': filament.endPtsList,
+        'compTime': filament.compTime,
+        'postprocessTime': filament.postprocessTime,
+        'postprocBranches': filament.postprocBranches,
+        'postprocEndPts': filament.postprocEndPts
+    }
+
+
+def computeRadii(segmentation, skeletonGraph, pixelDimensions, smallRAMmode, fileName, edtMode='two_pass',
+                 maxRadius=15, numWorkers=1):
+    """
+        Computes the radii of the skeleton nodes as the distance transform of the segmentation at their coordinates
+
+        Parameters
+        ----------
+        segmentation : numpy array
+            binary image
+
+        skeletonGraph : SkeletonGraph
+            compact graph of the skeleton
+
+        smallRAMmode : int
+            if 1 the distance transform is computed chunk by chunk with dask and written to a temporary zarr file
+
+        fileName : string
+            name of the temporary zarr file in small RAM mode
+
+        Returns
+        -------
+        radii : numpy array
+            float32 array with the radius of each node
+    """
+    if smallRAMmode == 0:
+        # radii are only needed at skeleton voxels, compute the distance transform around them
+        return dt.distance_transform_at(segmentation, skeletonGraph.coordinates, pixelDimensions, mode=edtMode,
+                                        max_radius=maxRadius, workers=numWorkers)
+    im_dask = da.from_array(segmentation, chunks=(128, 128, 128))
+    if segmentation.shape[0] * segmentation.shape[1] * segmentation.shape[2] > 16777216:
+        im_dask = da.from_array(segmentation, chunks='auto')
+    edt_func = distance_transform_edt_dask(
+        sampling=pixelDimensions
+    )
+    overlap = dt.get_overlap(maxRadius, pixelDimensions)
+    distTransf = da.map_overlap(
+        edt_func.compute_distance_transform,
+        im_dask,
+        dtype="float32",
+        depth=tuple(overlap),
+        boundary='reflect'
+    )
+    # write the distance transform chunk by chunk and read the radii at the skeleton voxels in one pass
+    zarrPath = 'tmp_zarr' + os.sep + fileName + '_radiusMatrix.zarr'
+    distTransf.to_zarr(zarrPath)
+    radii = _gather_chunked(zarr.open(zarrPath, mode='r'), skeletonGraph.coordinates)
+    if edtMode != 'tiled':
+        # radii larger than the overlap may be overestimated, compute them again with a sufficient overlap
+        inexact = np.flatnonzero(radii > min(overlap * np.asarray(pixelDimensions)))
+        radii[inexact] = dt.distance_transform_at(segmentation, skeletonGraph.coordinates[inexact], pixelDimensions,
+                                                  mode='two_pass', max_radius=maxRadius, workers=numWorkers)
+    return radii
 
 
 class distance_transform_edt_dask:
@@ -20,7 +159,7 @@ class distance_transform_edt_dask:
         self.sampling = sampling
 
     def compute_distance_transform(self, im):
-        return distance_transform_edt(im.astype(float), sampling=self.sampling)
+        return dt.distance_transform_edt(im, sampling=self.sampling, dtype=np.float32)
 
 
 class Graph:
@@ -29,15 +168,31 @@ class Graph:
 
         Parameters
         ----------
-        graph : networkx graph
-            networkx graph of a skeleton
+        skeletonGraph : SkeletonGraph
+            compact graph of a skeleton, if its radii are set the distance transform is skipped and the
+            segmentation is not used
+
+        edtMode : string
+            mode of the distance transform, 'exact', 'tiled' or 'two_pass' (see distance_transform.py)
+
+        maxRadius : float
+            maximum expected vessel radius, determines the overlap of the tiles of the distance transform
+
+        iterativePruning : int
+            if 1 branches are pruned until no branch fulfils the pruning criterion, otherwise in a single pass
+
+        statsWriter : StatisticsWriter, optional
+            writer of the statistics tables (see statistics_writer.py), the statistics of every filament are written
+            as soon as the filament is processed. The dictionaries below are then only filled if the extended output
+            (segments, branch and end points) or the experimental statistics (segment statistics, end points and
+            number of segments) need them, so the memory does not grow with the number of filaments.
 
         Examples
         --------
         Graph.segmentsTotal - total number of segments (branches between branch/end point and branch/end point)
 
         Graph.segmentsDict - A dictionary with the nth disjoint graph as the key containing a dictionary
-                                with key as the segment index (start node, end node) and value = list of nodes
+                                with key as the segment index (start node, end node) and value = array of node coordinates
 
         Graph.lengthDict - A dictionary with the nth disjoint graph as the key containing a dictionary
                                 with key as the segment index (start node, end node) and value = length of the segment
@@ -69,11 +224,12 @@ class Graph:
         Graph.diameterDict - A dictionary with the nth disjoint graph as the key containing a dictionary
                                 with key as the segment index (start node, end node) and value = avg diameter of the segment
     """
-    def __init__(self, segmentation, skeleton, networkxGraph, pixelDimensions, pruningScale, lengthLimit, diaScale,
+    def __init__(self, segmentation, skeleton, skeletonGraph, pixelDimensions, pruningScale, lengthLimit, diaScale,
                  branchingThreshold, expFlag, smallRAMmode, infoFile, graphCreation, fileName, removeBorderEndPts,
-                 removeEndPtsFromSmallFilaments, interpolate, splineDegree, cut_neighbor_brpt_segs):
+                 removeEndPtsFromSmallFilaments, interpolate, splineDegree, cut_neighbor_brpt_segs, numWorkers=1,
+                 edtMode='two_pass', maxRadius=15, iterativePruning=0, statsWriter=None):
         self.skeleton = skeleton
-        self.networkxGraph = networkxGraph
+        self.skeletonGraph = skeletonGraph
         self.pixelDims = pixelDimensions
         self.prunScale = pruningScale
         self.lengthLim = lengthLimit
@@ -89,6 +245,17 @@ class Graph:
         self.cut_neighbor_brpt_segs = cut_neighbor_brpt_segs
         self.expFlag = expFlag
         self.smallRAMmode = smallRAMmode
+        self.numWorkers = numWorkers
+        self.edtMode = edtMode
+        self.maxRadius = maxRadius
+        self.iterativePruning = iterativePruning
+        self.statsWriter = statsWriter
+        # statistics of the filaments which are kept besides writing them
+        keepAll = statsWriter is None
+        self._keepSegments = keepAll or graphCreation == 1
+        self._keepPoints = keepAll or graphCreation == 1 or expFlag == 1
+        self._keepStats = keepAll or expFlag == 1
+        self.radiusMatrix = None
         self.segmentsDict = defaultdict(dict)
         self.countSegmentsDict = {}
         self.branchPointsDict = {}
@@ -98,7 +265,7 @@ class Graph:
         self.compTime = 0
         self.postProcessTime = 0
         self.endPtsTopVsBottom = 0
-        self.nodesFinal = set()
+        self.nodesFinal = []
         self.runTimeDict = {
             'distTransformation': 0,
             'pruning': 0,
@@ -113,109 +280,63 @@ class Graph:
             'postProcBranches': 0,
             'postProcEndPts': 0
         }
-        self.nodeDegreeDict = dict(nx.degree(self.networkxGraph))
         # dictionaries containing all filament, segment and branch point statistics
         self.segStatsDict = defaultdict(dict)
         self.filStatsDict = defaultdict(dict)
         self.branchesBrPtDict = defaultdict(dict)
 
-        # calculate distance transform matrix
+        # calculate distance transform matrix, radii given with the skeleton graph are reused
         self.initTime = time.time()
-        if self.smallRAMmode == 0:
-            self.distTransf = distance_transform_edt(segmentation, sampling=self.pixelDims)
-        else:
-            im_dask = da.from_array(segmentation, chunks=(128, 128, 128))
-            if segmentation.shape[0] * segmentation.shape[1] * segmentation.shape[2] > 16777216:
-                im_dask = da.from_array(segmentation, chunks='auto')
-            edt_func = distance_transform_edt_dask(
-                sampling=self.pixelDims
-            )
-            self.distTransf = da.map_overlap(
-                edt_func.compute_distance_transform,
-                im_dask,
-                dtype="float",
-                depth=15,
-                boundary='reflect'
-            )
-        self.radiusMatrix = self.distTransf * self.skeleton
+        if self.skeletonGraph.radii is None:
+            self.skeletonGraph.radii = computeRadii(segmentation, self.skeletonGraph, self.pixelDims,
+                                                    self.smallRAMmode, self.fileName, self.edtMode, self.maxRadius,
+                                                    self.numWorkers)
+        if self.smallRAMmode == 1:
+            self.radiusMatrix = sg.SparseRadiusMatrix(self.skeletonGraph.coordinates, self.skeletonGraph.radii,
+                                                      self.skeletonGraph.shape)
         self.runTimeDict['distTransformation'] = round(time.time() - self.initTime, 3)
 
         # pruning: delete branches with length below the distance to its closest border
-        if self.smallRAMmode == 1:
-            # client = Client()
-            self.radiusMatrix.to_zarr('tmp_zarr' + os.sep + self.fileName + '_radiusMatrix.zarr')
-            self._prune(da.from_zarr('tmp_zarr' + os.sep + self.fileName + '_radiusMatrix.zarr'))
-            #client.submit(self._prune, da.from_zarr('tmp_zarr' + os.sep + self.fileName + '_radiusMatrix.zarr'))
-        else:
-            self._prune(self.radiusMatrix)
+        self._prune(self.skeletonGraph.radii)
 
-        self.filaments = list(self.connected_component_subgraphs(self.networkxGraph))
+        # filament graphs are views into arrays shared by all filaments
+        self.filaments, self.filamentStarts = self.skeletonGraph.split_components()
         # print("found {} filaments".format(len(self.filaments)))
 
     def setStats(self):
         """
-            Set the statistics of a networkx graph
+            Set the statistics of a skeleton graph
             1) go through each subgraph
-            2) calculate all end points and set one end point as beginning point
-            3) extract an adjacency dictionary of networkx subgraph
-            4) calculate the subgraphs statistics with the class Filament
-            5) save statistics for each filament
-
-            Parameters
-            ----------
-            Graph : networkx graph
-                networkx graph of a skeleton
+            2) calculate all end points and set the first end point as beginning point
+            3) calculate the subgraphs statistics with the class Filament, in numWorkers processes if numWorkers > 1
+            4) save statistics for each filament in the order of the subgraphs
         """
         # statistic calculation
         startTime = time.time()
         self.infoDict['filaments'] = len(self.filaments)
-        for ithDisjointGraph, subGraphSkeleton in enumerate(self.filaments):
-            nodeDegreeDict = dict(nx.degree(subGraphSkeleton))
-            endPoints = [k for (k, v) in nodeDegreeDict.items() if v == 1]
-            if endPoints:
-                start = endPoints[0]  # take random end point as beginning
-                adjacencyDict = nx.to_dict_of_lists(subGraphSkeleton)
-                filament = fil.Filament(adjacencyDict, start, self.radiusMatrix, self.pixelDims, self.lengthLim,
-                                        self.diaScale, self.branchingThresh, self.expFlag, self.smallRAMmode,
-                                        self.fileName, self.removeBorderEndPts, self.removeEndPtsFromSmallFilaments,
-                                        self.interpolate, self.splineDegree, self.cut_neighbor_brpt_segs)
-                filament.dfs_iterative()
-                self.segmentsDict[ithDisjointGraph] = filament.segmentsDict
-
-                # save nodes of filament after processing
-                nodes = list(self.segmentsDict[ithDisjointGraph].values())
-                nodes = set([item for sublist in nodes for item in sublist])
-                self.nodesFinal.update(nodes)
-
-                # filament may have no segments left after postprocessing
-                if len(self.segmentsDict[ithDisjointGraph]) != 0:
-                    self.countSegmentsDict[ithDisjointGraph] = len(self.segmentsDict[ithDisjointGraph])
-                    self.branchPointsDict[ithDisjointGraph] = filament.brPtsDict
-                    self.endPointsDict[ithDisjointGraph] = filament.endPtsList
-                    self.countBranchPointsDict[ithDisjointGraph] = len(filament.brPtsDict)
-                    self.countEndPointsDict[ithDisjointGraph] = len(filament.endPtsList)
-                    self.infoDict['segments'] += len(self.segmentsDict[ithDisjointGraph])
-                    self.runTimeDict['dfsComp'] += filament.compTime
-                    self.runTimeDict['postProcessing'] += filament.postprocessTime
-                    self.infoDict['postProcBranches'] += filament.postprocBranches
-                    self.infoDict['postProcEndPts'] += filament.postprocEndPts
-
-                    # fill dictionaries containing all filament, segment and branch point statistics
-                    self.segStatsDict[ithDisjointGraph] = filament.segmentStats
-                    self.filStatsDict[ithDisjointGraph]['TerminalPoints'] = self.countEndPointsDict[ithDisjointGraph]
-                    self.filStatsDict[ithDisjointGraph]['BranchPoints'] = self.countBranchPointsDict[ithDisjointGraph]
-                    self.filStatsDict[ithDisjointGraph]['Segments'] = self.countSegmentsDict[ithDisjointGraph]
-                    self.branchesBrPtDict[ithDisjointGraph] = filament.brPtsDict
-                else:
-                    self.infoDict['filaments'] -= 1
+        tasks = []
+        for ithDisjointGraph, start in enumerate(self.filamentStarts.tolist()):
+            if start != -1:
+                # first end point as beginning
+                tasks.append((ithDisjointGraph, self.filaments[ithDisjointGraph], start))
+        if self.numWorkers > 1 and len(tasks) > 1:
+            filaments = self._computeFilamentsParallel([task[1:] for task in tasks])
+        else:
+            filaments = self._computeFilaments([task[1:] for task in tasks])
+        # filaments are returned in the order of the tasks, so merging them is deterministic
+        for (ithDisjointGraph, _, _), results in zip(tasks, filaments):
+            self._addFilament(ithDisjointGraph, results)
         self.runTimeDict['statCalculation'] = round(time.time() - startTime, 3)
 
         if self.graphCreation == 1:
             # remove nodes which were removed in postprocessing of filaments in the overall graph
-            nodes_graph = set(self.networkxGraph.nodes)
-            nodes_to_remove = nodes_graph - self.nodesFinal
-            for node in nodes_to_remove:
-                self.networkxGraph.remove_node(node)
+            shape = self.skeletonGraph.shape
+            nodesGraph = np.ravel_multi_index(self.skeletonGraph.coordinates.T, shape)
+            if self.nodesFinal:
+                nodesFinal = np.ravel_multi_index(np.concatenate(self.nodesFinal).T, shape)
+            else:
+                nodesFinal = np.empty(0, dtype=np.int64)
+            self.skeletonGraph = self.skeletonGraph.remove_nodes(np.flatnonzero(~np.isin(nodesGraph, nodesFinal)))
             self.skeleton = self._get_final_skeleton()
 
         if self.expFlag == 1:
@@ -224,10 +345,76 @@ class Graph:
         if self.infoFile:
             self._writeInfoFile()
 
+    def _filamentArgs(self):
+        return (self.pixelDims, self.lengthLim, self.diaScale, self.branchingThresh, self.expFlag, self.smallRAMmode,
+                self.fileName, self.removeBorderEndPts, self.removeEndPtsFromSmallFilaments, self.interpolate,
+                self.splineDegree, self.cut_neighbor_brpt_segs)
+
+    def _computeFilaments(self, tasks):
+        for subGraphSkeleton, start in tasks:
+            filament = fil.Filament(subGraphSkeleton, start, subGraphSkeleton.radii, *self._filamentArgs(),
+                                    radiusMatrix=self.radiusMatrix)
+            filament.dfs_iterative()
+            yield _filament_results(filament, self._keepSegments)
+
+    def _computeFilamentsParallel(self, tasks):
+        """
+            Computes the filaments in numWorkers processes. Each filament is sent with the radii of its nodes,
+            the sparse radius matrix of small RAM mode is sent once to every worker. The results are yielded in the
+            order of the tasks as soon as they arrive.
+        """
+        chunksize = max(1, len(tasks) // (self.numWorkers * 4))
+        # spawn the workers in small RAM mode, forking after dask started its thread pools can deadlock them
+        context = multiprocessing.get_context('spawn' if self.smallRAMmode == 1 else None)
+        with context.Pool(self.numWorkers, initializer=_init_filament_worker,
+                          initargs=(self._filamentArgs(), self.radiusMatrix, self._keepSegments)) as pool:
+            for results in pool.imap(_filament_worker, tasks, chunksize=chunksize):
+                yield results
+
+    def _addFilament(self, ithDisjointGraph, results):
+        """
+            Writes the statistics of a processed filament as the ith disjoint graph and saves the results which are
+            kept (see statsWriter)
+        """
+        numSegments = results['numSegments']
+        if self._keepSegments:
+            self.segmentsDict[ithDisjointGraph] = results['segmentsDict']
+            # save nodes of filament after processing
+            self.nodesFinal.extend(results['segmentsDict'].values())
+
+        # filament may have no segments left after postprocessing
+        if numSegments == 0:
+            self.infoDict['filaments'] -= 1
+            return
+        self.infoDict['segments'] += numSegments
+        self.runTimeDict['dfsComp'] += results['compTime']
+        self.runTimeDict['postProcessing'] += results['postprocessTime']
+        self.infoDict['postProcBranches'] += results['postprocBranches']
+        self.infoDict['postProcEndPts'] += results['postprocEndPts']
+        filamentStats = {
+            'TerminalPoints': len(results['endPtsList']),
+            'BranchPoints': len(results['brPtsDict']),
+            'Segments': numSegments
+        }
+
+        if self._keepPoints:
+            self.countSegmentsDict[ithDisjointGraph] = numSegments
+            self.branchPointsDict[ithDisjointGraph] = results['brPtsDict']
+            self.endPointsDict[ithDisjointGraph] = results['endPtsList']
+            self.countBranchPointsDict[ithDisjointGraph] = filamentStats['BranchPoints']
+            self.countEndPointsDict[ithDisjointGraph] = filamentStats['TerminalPoints']
+        if self._keepStats:
+            # fill dictionaries containing all filament, segment and branch point statistics
+            self.segStatsDict[ithDisjointGraph] = results['segmentStats']
+            self.filStatsDict[ithDisjointGraph] = filamentStats
+            self.branchesBrPtDict[ithDisjointGraph] = results['brPtsDict']
+        if self.statsWriter is not None:
+            self.statsWriter.addFilament(ithDisjointGraph, results['segmentStats'], filamentStats,
+                                         results['brPtsDict'])
+
     def _get_final_skeleton(self):
-        skel = np.zeros(self.skeleton.shape)
-        for ind in list(self.networkxGraph.nodes):
-            skel[ind] = 1
+        skel = np.zeros(self.skeletonGraph.shape, dtype=bool)
+        skel[tuple(self.skeletonGraph.coordinates.T)] = True
         return skel
 
     def _writeInfoFile(self):
@@ -254,39 +441,93 @@ class Graph:
             Computers & Graphics 36, 477-487 (2012).
             Branches are removed when |ep - bp|^2 <= s * |f - bp|^2
             where ep = end point, bp = branch point, s = scaling factor, f = closest boundary point
+
+            Parameters
+            ----------
+            radiusMat : radii of the skeleton nodes
         """
         startTime = time.time()
-        endPtsList = [k for (k, v) in self.nodeDegreeDict.items() if v == 1]
-        branchesToRemove = []
-        for endPt in endPtsList:
-            visited, stack = set(), [endPt]
-            branch = []
-            while stack:
-                vertex = stack.pop()
-                if vertex not in visited:
-                    visited.add(vertex)
-                    branch.append(vertex)
-                    neighbors = [n for n in self.networkxGraph.neighbors(vertex)]
-                    for neighbor in neighbors:
-                        if neighbor not in visited:
-                            stack.append(neighbor)
-                    if len(neighbors) > 2:  # branch point found
-                        if ms.getLength(branch, self.pixelDims) <= radiusMat[vertex] * self.prunScale:
-                            branchesToRemove.append(branch)
-                        break
-        # delete branches from adjacency matrix besides branch points
-        for branch in branchesToRemove:
-            for node in branch[:-1]:
-                self.networkxGraph.remove_node(node)
+        if self.iterativePruning == 1:
+            removedNodes, numPruned = self._pruneIteratively(radiusMat)
+        else:
+            degree = self.skeletonGraph.degree
+            # walk the branches from all end points at once, a branch ends at the first node of degree != 2
+            nodes, offsets = self.skeletonGraph.walk_chains(np.flatnonzero(degree == 1))
+            lengths = ms.getLengths(self.skeletonGraph.coordinates[nodes], self.pixelDims, offsets)
+            branchPts = nodes[offsets[1:] - 1]
+            isPruned = (degree[branchPts] > 2) & \
+                (lengths <= np.asarray(radiusMat, dtype=np.float64)[branchPts] * self.prunScale)
+            # delete branches from the graph besides branch points
+            removed = np.repeat(isPruned, np.diff(offsets))
+            removed[offsets[1:] - 1] = False
+            removedNodes, numPruned = nodes[removed], int(isPruned.sum())
+        if len(removedNodes):
+            self.skeletonGraph = self.skeletonGraph.remove_nodes(removedNodes)
         self.runTimeDict['pruning'] = round(time.time() - startTime, 3)
-        self.infoDict['pruning'] = len(branchesToRemove)
+        self.infoDict['pruning'] = numPruned
 
-    def connected_component_subgraphs(self, G):
-        for c in nx.connected_components(G):
-            yield G.subgraph(c)
+    def _pruneIteratively(self, radiusMat):
+        """
+            Prunes branches in rounds until no branch fulfils the pruning criterion. Every round removes all
+            prunable branches together like a single pass, so the first round gives the result of the single pass.
+            Only the branches ending at branch points which were left with less than 3 branches are walked again for
+            the next round, since they now continue to the next branch point.
+
+            Parameters
+            ----------
+            radiusMat : radii of the skeleton nodes
+
+            Returns
+            -------
+            removedNodes : numpy array
+                node ids of the pruned branches besides their branch points
+
+            numPruned : int
+                number of pruned branches
+        """
+        graph = self.skeletonGraph.copy()   # edges are removed in place
+        degree = graph.degree
+        radii = np.asarray(radiusMat, dtype=np.float64)
+        branchEnds = defaultdict(set)   # branch point -> end points of the branches ending at it
+
+        def walk(endPts):
+            # returns the end points and nodes of the prunable branches starting at the end points
+            nodes, offsets = graph.walk_chains(endPts)
+            lengths = ms.getLengths(graph.coordinates[nodes], self.pixelDims, offsets).tolist()
+            prunable = []
+            for i, endPt in enumerate(endPts.tolist()):
+                branch = nodes[offsets[i]:offsets[i + 1]]
+                brPt = int(branch[-1])
+                if degree[brPt] > 2:
+                    branchEnds[brPt].add(endPt)
+                    if lengths[i] <= radii[brPt] * self.prunScale:
+                        prunable.append((endPt, branch))
+            return prunable
+
+        prunable = walk(np.flatnonzero(degree == 1))
+        removedBranches = []
+        while prunable:
+            touchedBrPts = set()
+            for endPt, branch in prunable:
+                brPt = int(branch[-1])
+                branchEnds[brPt].discard(endPt)
+                graph.remove_edge(int(branch[-2]), brPt)
+                removedBranches.append(branch[:-1])
+                touchedBrPts.add(brPt)
+            # branch points which became normal points or end points
+            endPts = []
+            for brPt in sorted(touchedBrPts):
+                if degree[brPt] <= 2:
+                    endPts.extend(sorted(branchEnds.pop(brPt, ())))
+                    if degree[brPt] == 1:
+                        endPts.append(brPt)
+            prunable = walk(np.array(endPts, dtype=np.int64)) if endPts else []
+        if not removedBranches:
+            return np.empty(0, dtype=np.int64), 0
+        return np.concatenate(removedBranches), len(removedBranches)
 
     def top_endPts_vs_bottom_endPts(self, gap=15):
-        z = self.radiusMatrix.shape[0] - 1
+        z = self.skeletonGraph.shape[0] - 1
         top_endPts = 0
         bottom_endPts = 0
         for filament in self.endPointsDict:
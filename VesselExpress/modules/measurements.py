@@ -34,7 +34,7 @@ def getRadius(distTrans, segment, smallRAMmode=0):
     sumRadii = 0
     if not smallRAMmode:
         for skelPt in segment:
-            sumRadii += distTrans[skelPt]
+            sumRadii += float(distTrans[skelPt])
     else:
         for i, skelPt in enumerate(segment):
             sumRadii += distTrans[skelPt]
@@ -100,6 +100,276 @@ def getVolume(skelRadii, segment, dimensions):
 #
 #     return volume, diameter
 
+def _sumSegments(values, offsets):
+    """
+        Sums values of a flat array per segment, segment i consists of values[offsets[i]:offsets[i + 1]]. The values
+        of a segment are added one after another like in the scalar functions, so the sums are identical.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    segLengths = np.diff(offsets)
+    sums = np.zeros(len(segLengths))
+    # all segments are summed together position by position, the longest segments first
+    order = np.argsort(-segLengths, kind='stable')
+    numActive = np.searchsorted(-segLengths[order], -np.arange(segLengths.max(initial=0)), side='left')
+    for position, count in enumerate(numActive.tolist()):
+        active = order[:count]
+        sums[active] += values[offsets[active] + position]
+    return sums
+
+
+def _getStepLengths(coords, offsets, dimensions):
+    """
+        Returns the distance of each point to the next point of its segment, 0 for the last point of a segment
+    """
+    steps = np.zeros(len(coords))
+    vect = np.diff(coords, axis=0) * np.asarray(dimensions)  # multiply pixel length with original length
+    steps[:-1] = np.sqrt(np.sum(vect * vect, axis=1))
+    steps[offsets[1:] - 1] = 0
+    return steps
+
+
+def _asBatch(coords, offsets):
+    """
+        Returns coordinates and offsets of a batch, a single (N, ndim) array without offsets is a batch of one segment
+    """
+    coords = np.asarray(coords)
+    if offsets is None:
+        offsets = [0, len(coords)]
+    return coords, np.asarray(offsets, dtype=np.int64)
+
+
+def getLengths(coords, dimensions, offsets=None):
+    """
+        Calculates the lengths of paths as distance between their nodes, batch version of getLength
+
+        Parameters
+        ----------
+        coords : numpy array
+            (N, ndim) array of the node coordinates of one path or flat array of the nodes of all paths
+
+        dimensions : list
+            list with pixel dimensions in desired unit (e.g. microns), float32 dimensions are computed in float64
+            3D: [z, y, x]   2D: [y, x]
+
+        offsets : numpy array, optional
+            path i consists of coords[offsets[i]:offsets[i + 1]], if not given coords is a single path
+
+        Returns
+        -------
+        lengths : numpy array
+            length of each path
+    """
+    coords, offsets = _asBatch(coords, offsets)
+    return _sumSegments(_getStepLengths(coords, offsets, np.asarray(dimensions, dtype=np.float64)), offsets)
+
+
+def getVolumes(radii, coords, dimensions, offsets=None):
+    """
+        Calculates the volumes of segments as sum of cylinders from each node to the next one, batch version of
+        getVolume
+
+        Parameters
+        ----------
+        radii : numpy array
+            radius of each node
+
+        coords : numpy array
+            (N, ndim) array of the node coordinates of one segment or flat array of the nodes of all segments
+
+        dimensions : list
+            list with pixel dimensions in desired unit (e.g. microns)
+
+        offsets : numpy array, optional
+            segment i consists of coords[offsets[i]:offsets[i + 1]], if not given coords is a single segment
+
+        Returns
+        -------
+        volumes : numpy array
+            volume of each segment
+    """
+    coords, offsets = _asBatch(coords, offsets)
+    steps = _getStepLengths(coords, offsets, np.asarray(dimensions, dtype=np.float64))
+    return _sumSegments(math.pi * np.asarray(radii, dtype=np.float64) ** 2 * steps, offsets)
+
+
+def getMeanRadii(radii, offsets):
+    """
+        Calculates the average radius of segments
+
+        Parameters
+        ----------
+        radii : numpy array
+            flat array with the radius of each node of all segments
+
+        offsets : numpy array
+            segment i consists of radii[offsets[i]:offsets[i + 1]]
+
+        Returns
+        -------
+        meanRadii : numpy array
+            average radius of each segment
+    """
+    return _sumSegments(np.asarray(radii, dtype=np.float64), offsets) / np.diff(offsets)
+
+
+def _getPredecessorVectorIndices(predLengths, factor):
+    """
+        Returns the index of the point in the predecessor, counted backwards from the branching point, which defines
+        its vector for the branching angle
+    """
+    if factor <= 0:     # take neighboring points from branching point
+        return np.ones_like(predLengths)
+    if factor == 0.5:   # take half of the segments from branching point
+        return (predLengths * factor).astype(np.int64)
+    if factor >= 1:     # take the whole segment from branching point
+        return predLengths - 1
+    # take points according to the factor of the segment lengths, at most the whole segment
+    predIdx = np.minimum(np.rint(predLengths * factor).astype(np.int64), predLengths - 1)
+    return np.where((predIdx == 0) | (predLengths == 2), 1, predIdx)
+
+
+def _getSegmentVectorIndices(segLengths, isCircleAt, factor):
+    """
+        Returns the index of the point in the segment which defines its vector for the branching angle
+    """
+    if factor <= 0:     # take neighboring points from branching point
+        return np.ones_like(segLengths)
+    if factor == 0.5:   # take half of the segments from branching point
+        return (segLengths * factor).astype(np.int64)
+    if factor >= 1:     # take the whole segment from branching point, in case of a circle the pre-last point
+        return np.where(isCircleAt(segLengths - 1), segLengths - 2, segLengths - 1)
+    # take points according to the factor of the segment lengths, at most the whole segment
+    segIdx = np.minimum(np.rint(segLengths * factor).astype(np.int64), segLengths - 1)
+    return np.where((segIdx == 0) | (segLengths == 2), 1, np.where(isCircleAt(segIdx), segLengths - 2, segIdx))
+
+
+def getPredecessorVectors(coords, offsets, dimensions, branchingFactor=0.25):
+    """
+        Calculates the vectors of segments as predecessors in the branching angle of the segments starting at their
+        last point (branching point)
+
+        Parameters
+        ----------
+        coords : numpy array
+            (N, ndim) flat array of the node coordinates of all segments
+
+        offsets : numpy array
+            segment i consists of coords[offsets[i]:offsets[i + 1]]
+
+        dimensions : list
+            list with pixel dimensions in desired unit (e.g. microns)
+
+        branchingFactor : float
+            length factor used for calculating the vectors of the segments for the branching angle
+
+        Returns
+        -------
+        predVectors : numpy array
+            (M, ndim) array of the vectors from the point chosen by the branching factor to the last point of each
+            segment
+    """
+    coords = np.asarray(coords)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    predLengths = np.diff(offsets)
+    lasts = offsets[1:] - 1
+    predIdx = _getPredecessorVectorIndices(predLengths, branchingFactor)
+    return (coords[lasts] - coords[lasts - predIdx]) * np.asarray(dimensions, dtype=np.float64)
+
+
+def getSegmentStats(coords, offsets, meanRadii, dimensions, predSegments, branchingFactor=0.25, curveCoords=None,
+                    curveOffsets=None, radiusMatrix=None, predVectors=None):
+    """
+        Calculates the statistics of many segments at once
+
+        Parameters
+        ----------
+        coords : numpy array
+            (N, ndim) flat array of the node coordinates of all segments
+
+        offsets : numpy array
+            segment i consists of coords[offsets[i]:offsets[i + 1]]
+
+        meanRadii : numpy array
+            average radius of each segment
+
+        dimensions : list
+            list with pixel dimensions in desired unit (e.g. microns)
+            3D: [z, y, x]   2D: [y, x]
+
+        predSegments : numpy array
+            index of the segment leading to the first node (branching point) of each segment, -1 if there is none
+
+        branchingFactor : float
+            length factor used for calculating the vectors of the segments for the branching angle
+
+        curveCoords, curveOffsets : numpy array, optional
+            interpolated curves of the segments in the same flat format, length, straightness and volume are
+            measured along them instead of the nodes
+
+        radiusMatrix : SparseRadiusMatrix, optional
+            if given, the volume is summed along the curve from the radii at the curve points instead of using
+            a cylinder of the average radius
+
+        predVectors : numpy array, optional
+            (M, ndim) vectors of the predecessors as returned by getPredecessorVectors, predSegments then indexes
+            these vectors instead of the segments
+
+        Returns
+        -------
+        stats : dict
+            columns 'diameter', 'straightness', 'length', 'volume' and 'branchingAngle' with one value per segment,
+            the branching angle of segments without predecessor is nan
+    """
+    coords = np.asarray(coords)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    predSegments = np.asarray(predSegments, dtype=np.int64)
+    dimensions = np.asarray(dimensions, dtype=np.float64)
+    if curveCoords is None:
+        curveCoords, curveOffsets = coords, offsets
+    curveOffsets = np.asarray(curveOffsets, dtype=np.int64)
+
+    # length as distance between the points and straightness = curveDisplacement / curveLength
+    lengths = getLengths(curveCoords, dimensions, curveOffsets)
+    vect = (curveCoords[curveOffsets[1:] - 1] - curveCoords[curveOffsets[:-1]]) * dimensions
+    curveDisplacement = np.sqrt(np.sum(vect * vect, axis=1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        straightness = curveDisplacement / lengths
+
+    if radiusMatrix is not None:
+        volumes = getVolumes(radiusMatrix.lookup(curveCoords.astype(np.int64)), curveCoords, dimensions, curveOffsets)
+    else:
+        volumes = math.pi * meanRadii ** 2 * lengths
+
+    # branching angle between the vectors of the predecessor and the segment starting at the branching point,
+    # the vector of a predecessor is computed once and shared by all segments starting at its branching point
+    segLengths = np.diff(offsets)
+    firsts = offsets[:-1]
+    hasPred = predSegments >= 0
+    preds = np.where(hasPred, predSegments, 0)
+    if predVectors is None:
+        predVectors = getPredecessorVectors(coords, offsets, dimensions, branchingFactor)
+    segPredVect = np.asarray(predVectors, dtype=np.float64).reshape(-1, len(dimensions))[preds]
+
+    def isCircleAt(index):
+        return np.all(coords[firsts + index] == coords[firsts], axis=1)
+
+    segIdx = _getSegmentVectorIndices(segLengths, isCircleAt, branchingFactor)
+    segVect = (coords[firsts + segIdx] - coords[firsts]) * dimensions
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cosineAngles = np.sum(segPredVect * segVect, axis=1) / (np.sqrt(np.sum(segPredVect * segPredVect, axis=1)) *
+                                                                  np.sqrt(np.sum(segVect * segVect, axis=1)))
+        angles = np.round(np.degrees(np.arccos(np.round(cosineAngles, 4))), 4)
+    angles[~hasPred] = np.nan
+
+    return {
+        'diameter': meanRadii * 2,
+        'straightness': straightness,
+        'length': lengths,
+        'volume': volumes,
+        'branchingAngle': angles
+    }
+
+
 def get_z_angle(segment, pixelDims):
     zVector = [1, 0, 0]
     v1 = segment[0]
@@ -125,3 +395,42 @@ def get_z_angle(segment, pixelDims):
     return round(np.degrees(angle), 4)
 
 
+def get_z_angles(coords, pixelDims, offsets=None):
+    """
+        Calculates the angles between segments and the z axis, batch version of get_z_angle
+
+        Parameters
+        ----------
+        coords : numpy array
+            (N, 3) array of the node coordinates of one segment or flat array of the nodes of all segments
+
+        pixelDims : list
+            pixel dimensions [z, y, x]
+
+        offsets : numpy array, optional
+            segment i consists of coords[offsets[i]:offsets[i + 1]], if not given coords is a single segment
+
+        Returns
+        -------
+        angles : numpy array
+            angle of each segment in degrees
+    """
+    coords, offsets = _asBatch(coords, offsets)
+    firsts = coords[offsets[:-1]]
+    lasts = coords[offsets[1:] - 1]
+    # in case of a circle, take pre-last point
+    isCircle = np.all(firsts == lasts, axis=1)
+    lasts = np.where(isCircle[:, None], coords[offsets[1:] - 2], lasts)
+
+    # vector from the point closer to the z axis to the other one
+    dist_v1_z = np.sqrt(np.sum(firsts[:, 1:].astype(np.float64) ** 2, axis=1))
+    dist_v2_z = np.sqrt(np.sum(lasts[:, 1:].astype(np.float64) ** 2, axis=1))
+    segVector = np.where((dist_v1_z < dist_v2_z)[:, None], lasts - firsts, firsts - lasts)
+    segVector = segVector * np.asarray(pixelDims, dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cosine_angle = segVector[:, 0] / np.sqrt(np.sum(segVector * segVector, axis=1))
+        angle = np.arccos(np.round(cosine_angle, 4))
+    return np.round(np.degrees(angle), 4)
+
+
@@ -1,16 +1,17 @@
 import itertools
-# import time
+from multiprocessing import Pool
 
 import numpy as np
-import networkx as nx
-from scipy.ndimage import convolve
+
+import skeleton_graph as sg
+import utils
 
 """
-program to look up adjacent elements and calculate degree
-this dictionary can be used for graph creation
-since networkx graph based on looking up the array and the
-adjacent coordinates takes long time. create a dict
-using dict_of_indices_and_adjacent_coordinates.
+program to look up adjacent elements of a skeleton and build its graph
+since looking up the adjacent coordinates of every nonzero voxel one by one
+takes a long time, all edges are found at once by comparing the array with
+shifted copies of itself. Only the 13 (3D) or 4 (2D) offsets of the half
+neighborhood are needed, the other half gives the same edges reversed.
 (-1 -1 -1) (-1 0 -1) (-1 1 -1)
 (-1 -1 0)  (-1 0 0)  (-1 1 0)
 (-1 -1 1)  (-1 0 1)  (-1 1 1)
@@ -24,151 +25,402 @@ using dict_of_indices_and_adjacent_coordinates.
 (1 -1 1)  (1 0 1)  (1 1 1)
 """
 
-# permutations of (-1, 0, 1) in three/two dimensional tuple format
-# representing 8 and 26 increments around a pixel at origin (0, 0, 0)
-# 2nd ordered neighborhood around a voxel/pixel
-LIST_STEP_DIRECTIONS3D = list(itertools.product((-1, 0, 1), repeat=3))
-LIST_STEP_DIRECTIONS3D.remove((0, 0, 0))
+# offsets of (-1, 0, 1) in three/two dimensional tuple format which are lexicographically
+# greater than the origin, i.e. the 13 and 4 increments of the half neighborhood around a voxel/pixel
+# the linear index of the neighbor in such a direction is always greater than the one of the voxel itself
+HALF_STEP_DIRECTIONS3D = [step for step in itertools.product((-1, 0, 1), repeat=3) if step > (0, 0, 0)]
+HALF_STEP_DIRECTIONS2D = [step for step in itertools.product((-1, 0, 1), repeat=2) if step > (0, 0)]
+
+# skeleton image opened by the current process, reused for all tiles of the same file
+_opened_skeleton = (None, None)
+
+
+def _get_shifted_slices(step, shape):
+    """
+    Return the slices of all voxels/pixels which have a neighbor in direction step
+    and the slices of these neighbors
+    Parameters
+    ----------
+    step : tuple
+        incremental direction, entries in (-1, 0, 1)
+
+    shape : tuple
+        shape of the array
+
+    Returns
+    -------
+    source, target : tuple of slices
+        arr[source] and arr[target] have the same shape and arr[target] is arr[source] shifted by step
+    """
+    source = tuple(slice(max(0, -s), n - max(0, s)) for s, n in zip(step, shape))
+    target = tuple(slice(max(0, s), n - max(0, -s)) for s, n in zip(step, shape))
+    return source, target
+
+
+def _get_step_directions(dimensions):
+    assert dimensions in [2, 3], "array dimensions must be 2 or 3, they are {}".format(dimensions)
+    return HALF_STEP_DIRECTIONS3D if dimensions == 3 else HALF_STEP_DIRECTIONS2D
+
 
-LIST_STEP_DIRECTIONS2D = list(itertools.product((-1, 0, 1), repeat=2))
-LIST_STEP_DIRECTIONS2D.remove((0, 0))
+def _get_linear_steps(shape):
+    """
+    Return the differences of linear indices in C order for all steps of the half neighborhood
+    """
+    strides = np.array([int(np.prod(shape[dim + 1:])) for dim in range(len(shape))], dtype=np.int64)
+    return [int(np.dot(step, strides)) for step in _get_step_directions(len(shape))]
+
+
+def _sort_edges(linear_indices, sources, targets):
+    """
+    Return the edges given as lists of linear indices as sorted (E, 2) int32 array of node ids
+    """
+    sources = np.searchsorted(linear_indices, np.concatenate(sources)).astype(np.int32)
+    targets = np.searchsorted(linear_indices, np.concatenate(targets)).astype(np.int32)
+    order = np.lexsort((targets, sources))
+    return np.stack((sources[order], targets[order]), axis=1)
 
 
-def _get_increments(config_number, dimensions):
+def get_edges_from_array(binary_arr, sparse=False):
     """
-    Return position of non zero voxels/pixels in the
-    binary string of config number
+    Return the nonzero coordinates of a binary array and all edges between them
+    in their second order neighborhood
     Parameters
     ----------
-    config_number : int64
-        integer less than 2 ** 26
+    binary_arr : numpy array
+        binary numpy array can only be 2D Or 3D
 
-    dimensions: int
-        number of dimensions, can only be 2 or 3
+    sparse : bool
+        if True only the list of nonzero coordinates is used to find the edges (see get_edges_from_coordinates),
+        otherwise the array is compared with shifted copies of itself
 
     Returns
     -------
-    list
-        a list of incremental direction of a non zero voxel/pixel
+    coordinates : numpy array
+        (N, ndim) array of nonzero coordinates in lexicographic (C) order,
+        the row index of a coordinate is its node id
+
+    edges : numpy array
+        (E, 2) int32 array of node id pairs (u, v) with u < v, sorted lexicographically
+    """
+    if sparse:
+        return get_edges_from_coordinates(np.transpose(np.nonzero(binary_arr)), np.shape(binary_arr))
+    arr = np.asarray(binary_arr) != 0
+    step_directions = _get_step_directions(arr.ndim)
+    coordinates = np.transpose(np.nonzero(arr))
+    # linear indices of nonzero coordinates are sorted as np.nonzero returns them in C order
+    linear_indices = np.ravel_multi_index(coordinates.T, arr.shape)
+    sources, targets = [], []
+    for step, linear_step in zip(step_directions, _get_linear_steps(arr.shape)):
+        source, target = _get_shifted_slices(step, arr.shape)
+        # positions relative to the source slice where a voxel and its neighbor in direction step are nonzero
+        positions = np.nonzero(arr[source] & arr[target])
+        source_linear = np.ravel_multi_index(tuple(pos + sl.start for pos, sl in zip(positions, source)), arr.shape)
+        sources.append(source_linear)
+        targets.append(source_linear + linear_step)
+    return coordinates, _sort_edges(linear_indices, sources, targets)
+
+
+def get_edges_from_coordinates(coordinates, shape):
+    """
+    Return the sorted coordinates and all edges between them in their second order neighborhood
+    Parameters
+    ----------
+    coordinates : numpy array
+        (N, ndim) array of nonzero coordinates of a skeleton, 2D Or 3D
+
+    shape : tuple
+        shape of the array the coordinates belong to
+
+    Returns
+    -------
+    coordinates : numpy array
+        (N, ndim) array of the coordinates in lexicographic (C) order,
+        the row index of a coordinate is its node id
+
+    edges : numpy array
+        (E, 2) int32 array of node id pairs (u, v) with u < v, sorted lexicographically
 
     Notes
     ------
-    As in the beginning of the program, there are incremental directions
-    around a voxel at origin (0, 0, 0) which are returned by this function.
-    config_number is a decimal number representation of 26 binary numbers
-    around a voxel at the origin in a second ordered neighborhood
+    Neighbors are looked up by a binary search of the shifted linear indices in the
+    sorted linear indices of all coordinates, so memory is proportional to the number
+    of coordinates and not to the size of the array.
     """
-    config_number = np.int64(config_number)
-    if dimensions == 3:
-        # convert decimal number to a binary string
-        list_step_directions = LIST_STEP_DIRECTIONS3D
-    elif dimensions == 2:
-        list_step_directions = LIST_STEP_DIRECTIONS2D
-    neighbor_values = [(config_number >> digit) & 0x01 for digit in range(3 ** dimensions - 1)]
-    return [neighbor_value * increment for neighbor_value, increment in zip(neighbor_values, list_step_directions)]
+    coordinates = np.asarray(coordinates).reshape(-1, len(shape))
+    step_directions = _get_step_directions(len(shape))
+    linear_indices = np.ravel_multi_index(coordinates.T, shape)
+    if np.any(linear_indices[1:] < linear_indices[:-1]):
+        order = np.argsort(linear_indices)
+        coordinates, linear_indices = coordinates[order], linear_indices[order]
+    sources, targets = [], []
+    for step, linear_step in zip(step_directions, _get_linear_steps(shape)):
+        # only coordinates whose neighbor in direction step lies inside of the array
+        inside = np.ones(len(coordinates), dtype=bool)
+        for dim, increment in enumerate(step):
+            if increment == 1:
+                inside &= coordinates[:, dim] < shape[dim] - 1
+            elif increment == -1:
+                inside &= coordinates[:, dim] > 0
+        source_linear = linear_indices[inside]
+        target_linear = source_linear + linear_step
+        positions = np.minimum(np.searchsorted(linear_indices, target_linear), len(linear_indices) - 1)
+        found = linear_indices[positions] == target_linear
+        sources.append(source_linear[found])
+        targets.append(target_linear[found])
+    return coordinates, _sort_edges(linear_indices, sources, targets)
 
 
-def _set_adjacency_list(arr):
+def _open_skeleton(filepath):
     """
-    Return position of non zero voxels/pixels in the
-    binary string of config number
+    Return a lazily read array of a skeleton image, slices are only read from disk when accessed
     Parameters
     ----------
-    arr : numpy array
-        binary numpy array can only be 2D Or 3D
+    filepath : string
+        path of a zarr store or a TIFF file, uncompressed TIFF files are memory-mapped and
+        compressed ones are read chunk by chunk through a zarr store
+    """
+    return utils.read_img(filepath, lazy=True)
+
+
+def _get_tile_edges(task):
+    """
+    Return the nonzero voxels/pixels of a tile and all edges starting at them
+    Parameters
+    ----------
+    task : tuple
+        (filepath, start, stop) of the tile, start and stop are the corners of the tile in the image
 
     Returns
     -------
-    dict_of_indices_and_adjacent_coordinates: Dictionary
-        key is the nonzero coordinate in input "arr" and value
-        is all the position of nonzero coordinates around it
-        in it's second order neighborhood
+    node_linear, source_linear, target_linear : numpy array
+        linear indices of the nonzero voxels/pixels in the tile and of the edges (u, v) with u inside of the tile
 
+    Notes
+    ------
+    The tile is read with a halo of one voxel/pixel, so all neighbors of its voxels/pixels are known.
+    Each edge is only reported by the tile containing its smaller node, which deduplicates edges at tile borders.
     """
-    dimensions = arr.ndim
-    assert dimensions in [2, 3], "array dimensions must be 2 or 3, they are {}".format(dimensions)
-    if dimensions == 3:
-        # flipped 3D template in advance
-        template = np.array([[[33554432, 16777216, 8388608], [4194304, 2097152, 1048576], [524288, 262144, 131072]],
-                            [[65536, 32768, 16384], [8192, 0, 4096], [2048, 1024, 512]],
-                            [[256, 128, 64], [32, 16, 8], [4, 2, 1]]], dtype=np.uint64)
-    else:
-        # 2 dimensions
-        template = np.array([[128, 64, 32], [16, 0, 8], [4, 2, 1]], dtype=np.uint64)
-    # convert the binary array to a configuration number array of same size
-    # by convolving with template
-    arr = np.ascontiguousarray(arr, dtype=np.uint64)
-    result = convolve(arr, template, mode='constant', cval=0)
-    # set the values in convolution result to zero which were zero in 'arr'
-    result[arr == 0] = 0
-    dict_of_indices_and_adjacent_coordinates = {}
-    # list of nonzero tuples
-    non_zeros = list(set(map(tuple, np.transpose(np.nonzero(arr)))))
-    if np.sum(arr) == 1:
-        # if there is just one nonzero element there are no adjacent coordinates
-        dict_of_indices_and_adjacent_coordinates[non_zeros[0]] = []
+    global _opened_skeleton
+    filepath, start, stop = task
+    if _opened_skeleton[0] != filepath:
+        _opened_skeleton = (filepath, _open_skeleton(filepath))
+    skeleton = _opened_skeleton[1]
+    shape = skeleton.shape
+    halo_start = [max(0, a - 1) for a in start]
+    halo_stop = [min(n, b + 1) for b, n in zip(stop, shape)]
+    block = np.asarray(skeleton[tuple(slice(a, b) for a, b in zip(halo_start, halo_stop))])
+    coordinates, edges = get_edges_from_coordinates(np.transpose(np.nonzero(block)), block.shape)
+    coordinates = coordinates + np.array(halo_start, dtype=coordinates.dtype)
+    inside = np.all((coordinates >= np.array(start)) & (coordinates < np.array(stop)), axis=1)
+    linear_indices = np.ravel_multi_index(coordinates.T, shape)
+    edges = edges[inside[edges[:, 0]]]
+    return linear_indices[inside], linear_indices[edges[:, 0]], linear_indices[edges[:, 1]]
+
+
+def _get_chunk_aligned_tile_shape(tile_shape, chunks, shape):
+    """
+    Return the shape of the tiles of a chunked array, which cover whole chunks along the axes where a chunk is larger
+    than a tile and are shortened along the other axes to keep the number of voxels/pixels of a tile
+    Parameters
+    ----------
+    tile_shape : tuple
+        requested shape of the tiles
+
+    chunks : tuple or None
+        shape of the chunks of the array, None if it is not chunked
+
+    shape : tuple
+        shape of the array
+
+    Notes
+    ------
+    A chunk is decoded as a whole whenever a tile touches it. Compressed or 1-bit TIFF files are read through zarr with
+    one page per chunk, so tiles smaller than a page would decode every page once per tile of its tile row.
+    """
+    if chunks is None:
+        return tuple(tile_shape)
+    chunks = [min(c, n) for c, n in zip(chunks, shape)]
+    extended = [c > t for t, c in zip(tile_shape, chunks)]
+    if not any(extended):
+        return tuple(tile_shape)
+    scale = np.prod(tile_shape) / np.prod([c for c, e in zip(chunks, extended) if e])
+    scale = (scale / np.prod([t for t, e in zip(tile_shape, extended) if not e])) ** (1 / max(1, extended.count(False)))
+    return tuple(c if e else max(c, int(t * scale) // c * c) for t, c, e in zip(tile_shape, chunks, extended))
+
+
+def get_edges_from_tiles(filepath, tile_shape, workers=1):
+    """
+    Return the nonzero coordinates of a skeleton image file and all edges between them
+    in their second order neighborhood without reading the whole image into memory
+    Parameters
+    ----------
+    filepath : string
+        path of a zarr store or a TIFF file of a binary 2D Or 3D skeleton
+
+    tile_shape : int or tuple
+        shape of the tiles which are read one at a time, tiles of a file read chunk by chunk are aligned to its chunks
+
+    workers : int
+        number of worker processes computing the edges of the tiles in parallel
+
+    Returns
+    -------
+    coordinates : numpy array
+        (N, ndim) array of nonzero coordinates in lexicographic (C) order,
+        the row index of a coordinate is its node id
+
+    edges : numpy array
+        (E, 2) int32 array of node id pairs (u, v) with u < v, sorted lexicographically
+    """
+    global _opened_skeleton
+    _opened_skeleton = (None, None)
+    skeleton = _open_skeleton(filepath)
+    shape = skeleton.shape
+    _get_step_directions(len(shape))
+    if np.isscalar(tile_shape):
+        tile_shape = (int(tile_shape),) * len(shape)
+    tile_shape = _get_chunk_aligned_tile_shape(tile_shape, getattr(skeleton, 'chunks', None), shape)
+    corners = itertools.product(*[range(0, n, t) for n, t in zip(shape, tile_shape)])
+    tasks = [(filepath, start, tuple(min(a + t, n) for a, t, n in zip(start, tile_shape, shape)))
+             for start in corners]
+    if workers > 1:
+        with Pool(workers) as pool:
+            results = pool.map(_get_tile_edges, tasks)
     else:
-        for item in non_zeros:
-            adjacent_coordinate_list = [tuple(np.array(item) + np.array(increments))
-                                        for increments in _get_increments(result[item], dimensions) if increments != ()]
-            dict_of_indices_and_adjacent_coordinates[item] = adjacent_coordinate_list
-    return dict_of_indices_and_adjacent_coordinates
+        results = [_get_tile_edges(task) for task in tasks]
+    linear_indices = np.sort(np.concatenate([result[0] for result in results]))
+    coordinates = np.stack(np.unravel_index(linear_indices, shape), axis=1)
+    edges = _sort_edges(linear_indices, [result[1] for result in results], [result[2] for result in results])
+    return coordinates, edges
 
 
-def _remove_clique_edges(networkx_graph):
+def _has_edges(edge_keys, sources, targets, num_nodes):
     """
-    Return 3 vertex clique removed graph
+    Return a boolean array which is true where the edge (sources, targets) exists
     Parameters
     ----------
-    networkx_graph : Networkx graph
-        graph to remove cliques from
+    edge_keys : numpy array
+        sorted int64 keys u * num_nodes + v of all edges (u, v) with u < v
+
+    sources, targets : numpy array
+        node ids of the edges to look up, in any order
+
+    num_nodes : int
+        number of nodes in the graph
+    """
+    keys = np.minimum(sources, targets).astype(np.int64) * num_nodes + np.maximum(sources, targets)
+    positions = np.minimum(np.searchsorted(edge_keys, keys), len(edge_keys) - 1)
+    return edge_keys[positions] == keys
+
+
+def _remove_clique_edges(coordinates, edges):
+    """
+    Return edge array with 3 vertex clique edges removed
+    Parameters
+    ----------
+    coordinates : numpy array
+        (N, ndim) array of node coordinates
+
+    edges : numpy array
+        (E, 2) array of node id pairs (u, v) with u < v, sorted lexicographically
 
     Returns
     -------
-    networkx_graph: Networkx graph
-        graph with 3 vertex clique edges removed
+    edges : numpy array
+        edge array with 3 vertex clique edges removed
 
     Notes
     ------
     Removes the longest edge in a 3 Vertex cliques,
     Special case edges are the edges with equal
     lengths that form the 3 vertex clique.
-    Doesn't deal with any other cliques
+    Doesn't deal with any other cliques, triangles
+    which are part of a larger clique are kept.
+    All vertices of a clique lie in one 2x2(x2) neighborhood, so
+    the triangles are found by looking only at neighbors of neighbors
+    which takes linear time in the number of edges.
     """
     #start = time.time()
-    cliques = nx.find_cliques_recursive(networkx_graph)
-    # all the nodes/vertices of 3 cliques
-    three_vertex_cliques = [clq for clq in cliques if len(clq) == 3]
-    if len(list(three_vertex_cliques)) != 0:
-        combination_edges = [list(itertools.combinations(clique, 2)) for clique in three_vertex_cliques]
-        subgraph_edge_lengths = []
-        # different combination of edges in the cliques and their lengths
-        for combinationEdge in combination_edges:
-            subgraph_edge_lengths.append([np.sum((np.array(item[0]) - np.array(item[1])) ** 2)
-                                          for item in combinationEdge])
-        clique_edges = []
-        # clique edges to be removed are collected here
-        # the edges with maximum edge length
-        for main_dim, item in enumerate(subgraph_edge_lengths):
-            if len(set(item)) != 1:
-                for sub_dim, length in enumerate(item):
-                    if length == max(item):
-                        clique_edges.append(combination_edges[main_dim][sub_dim])
-            else:
-                special_case = combination_edges[main_dim]
-                diff_of_edges = []
-                for num_spcl_edges in range(0, 3):
-                    source = list(special_case[num_spcl_edges][0])
-                    target = list(special_case[num_spcl_edges][1])
-                    diff_of_edges.append([i - j for i, j in zip(source, target)])
-                for index, val in enumerate(diff_of_edges):
-                    if val[0] == 0:
-                        sub_dim = index
-                        clique_edges.append(combination_edges[main_dim][sub_dim])
-                        break
-        networkx_graph.remove_edges_from(clique_edges)
-        #print("time taken to remove cliques is %0.2f seconds" % (time.time() - start))
-    return networkx_graph
+    num_nodes = len(coordinates)
+    if len(edges) == 0:
+        return edges
+    edges = edges.astype(np.int64)
+    edge_keys = edges[:, 0] * num_nodes + edges[:, 1]
+    # forward neighbors (greater node ids) of each node are the edges grouped by their first node
+    forward_ptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(edges[:, 0], minlength=num_nodes), out=forward_ptr[1:])
+    forward_degree = np.diff(forward_ptr)
+
+    # triangles (a, b, c) with a < b < c from edges (a, b) and (b, c), closed by edge (a, c)
+    counts = forward_degree[edges[:, 1]]
+    offsets = np.cumsum(counts) - counts
+    positions = np.repeat(forward_ptr[edges[:, 1]] - offsets, counts) + np.arange(counts.sum())
+    a = np.repeat(edges[:, 0], counts)
+    b = np.repeat(edges[:, 1], counts)
+    c = edges[positions, 1]
+    closed = _has_edges(edge_keys, a, c, num_nodes)
+    triangles = np.stack((a[closed], b[closed], c[closed]), axis=1)
+
+    # only maximal cliques of size 3 are treated: drop triangles with a vertex x adjacent to all three vertices
+    sources = np.concatenate((edges[:, 0], edges[:, 1]))
+    targets = np.concatenate((edges[:, 1], edges[:, 0]))
+    order = np.argsort(sources, kind='stable')
+    ptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_nodes), out=ptr[1:])
+    counts = np.diff(ptr)[triangles[:, 0]]
+    offsets = np.cumsum(counts) - counts
+    positions = np.repeat(ptr[triangles[:, 0]] - offsets, counts) + np.arange(counts.sum())
+    x = targets[order][positions]
+    triangle_ids = np.repeat(np.arange(len(triangles)), counts)
+    b, c = triangles[triangle_ids, 1], triangles[triangle_ids, 2]
+    larger = (x != b) & (x != c)
+    larger[larger] = _has_edges(edge_keys, x[larger], b[larger], num_nodes) & \
+        _has_edges(edge_keys, x[larger], c[larger], num_nodes)
+    triangles = triangles[np.bincount(triangle_ids[larger], minlength=len(triangles)) == 0]
+
+    # different combination of edges in the cliques and their lengths
+    combination_edges = np.stack((triangles[:, [0, 1]], triangles[:, [0, 2]], triangles[:, [1, 2]]), axis=1)
+    diff_of_edges = coordinates[combination_edges[:, :, 0]].astype(np.int64) - \
+        coordinates[combination_edges[:, :, 1]]
+    subgraph_edge_lengths = np.sum(diff_of_edges ** 2, axis=2)
+    max_lengths = subgraph_edge_lengths.max(axis=1, initial=0)
+    equal_lengths = np.all(subgraph_edge_lengths == subgraph_edge_lengths[:, :1], axis=1)
+    # clique edges to be removed are the edges with maximum edge length
+    clique_edges = (subgraph_edge_lengths == max_lengths[:, None]) & ~equal_lengths[:, None]
+    # special case of equal lengths: remove the first edge with no difference along the first axis
+    flat_edges = diff_of_edges[:, :, 0] == 0
+    first_flat = np.argmax(flat_edges, axis=1)
+    special_case = np.flatnonzero(equal_lengths & flat_edges.any(axis=1))
+    clique_edges[special_case, first_flat[special_case]] = True
+    clique_edges = combination_edges[clique_edges]
+    remove = np.isin(edge_keys, clique_edges[:, 0] * num_nodes + clique_edges[:, 1])
+    #print("time taken to remove cliques is %0.2f seconds" % (time.time() - start))
+    return edges[~remove].astype(np.int32)
+
+
+def get_skeleton_graph_from_array(binary_arr, sparse=False):
+    """
+    Return a compact skeleton graph from a binary numpy array
+    Parameters
+    ----------
+    binary_arr : numpy array
+        binary numpy array can only be 2D Or 3D
+
+    sparse : bool
+        if True the edges are found on the list of nonzero coordinates with memory
+        proportional to the number of skeleton voxels instead of the array size
+
+    Returns
+    -------
+    skeleton_graph : SkeletonGraph
+        CSR graph of the input array after clique removal with int32 node ids in C order of the voxels
+    """
+    assert np.max(binary_arr) in [0, 1], "input must always be a binary array"
+    #start = time.time()
+    coordinates, edges = get_edges_from_array(binary_arr, sparse)
+    edges = _remove_clique_edges(coordinates, edges)
+    #print("time taken to obtain skeleton graph is %0.3f seconds" % (time.time() - start))
+    return sg.SkeletonGraph.from_edges(coordinates, edges, np.shape(binary_arr))
 
 
 def get_networkx_graph_from_array(binary_arr):
@@ -184,10 +436,28 @@ def get_networkx_graph_from_array(binary_arr):
     networkx_graph : Networkx graph
         graphical representation of the input array after clique removal
     """
-    assert np.max(binary_arr) in [0, 1], "input must always be a binary array"
-    #start = time.time()
-    dict_of_indices_and_adjacent_coordinates = _set_adjacency_list(binary_arr)
-    networkx_graph = nx.from_dict_of_lists(dict_of_indices_and_adjacent_coordinates)
-    _remove_clique_edges(networkx_graph)
-    #print("time taken to obtain networkxgraph is %0.3f seconds" % (time.time() - start))
-    return networkx_graph
+    return get_skeleton_graph_from_array(binary_arr).to_networkx()
+
+
+def get_skeleton_graph_from_file(filepath, tile_shape, workers=1):
+    """
+    Return a compact skeleton graph from a skeleton image file which is read tile by tile
+    Parameters
+    ----------
+    filepath : string
+        path of a zarr store or a TIFF file of a binary 2D Or 3D skeleton
+
+    tile_shape : int or tuple
+        shape of the tiles which are read one at a time
+
+    workers : int
+        number of worker processes computing the edges of the tiles in parallel
+
+    Returns
+    -------
+    skeleton_graph : SkeletonGraph
+        CSR graph of the skeleton after clique removal with int32 node ids in C order of the voxels
+    """
+    coordinates, edges = get_edges_from_tiles(filepath, tile_shape, workers)
+    edges = _remove_clique_edges(coordinates, edges)
+    return sg.SkeletonGraph.from_edges(coordinates, edges, _open_skeleton(filepath).shape)
@@ -0,0 +1,308 @@
+import numpy as np
+import networkx as nx
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+class SkeletonGraph:
+    """
+        Compact undirected graph of a skeleton stored as compressed sparse rows (CSR)
+
+        Parameters
+        ----------
+        coordinates : numpy array
+            (N, ndim) array of voxel coordinates, the row index of a coordinate is its node id
+            3D: [z, y, x]   2D: [y, x]
+
+        indptr : numpy array
+            (N + 1,) array, the neighbors of node i are stored in indices[indptr[i]:indptr[i + 1]]
+
+        indices : numpy array
+            int32 array of neighbor node ids, sorted ascending within each row
+
+        shape : tuple
+            shape of the image the skeleton was extracted from
+
+        radii : numpy array, optional
+            float32 array with the radius of each node, it is kept aligned to the node ids by subgraph and remove_nodes
+
+        Examples
+        --------
+        SkeletonGraph.degree - int32 array with the number of neighbors of each node
+
+        SkeletonGraph.neighbors(i) - array of node ids adjacent to node i
+
+        SkeletonGraph.subgraph(nodes) - new graph induced by the node ids, nodes are relabelled in ascending order
+
+        Notes
+        --------
+        Node ids are ordered like the voxels in C order, so iterating over nodes or neighbors is deterministic.
+        Removing edges is done in place by shifting the remaining neighbors of a row to the front,
+        removing nodes returns a new compacted graph.
+    """
+    def __init__(self, coordinates, indptr, indices, shape, radii=None):
+        self.coordinates = np.asarray(coordinates, dtype=np.int32).reshape(-1, len(shape))
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.shape = tuple(shape)
+        self._degree = np.diff(self.indptr).astype(np.int32)
+        self.radii = None if radii is None else np.asarray(radii, dtype=np.float32)
+
+    @classmethod
+    def from_edges(cls, coordinates, edges, shape):
+        """
+            Create a graph from an edge array
+
+            Parameters
+            ----------
+            coordinates : (N, ndim) array of node coordinates
+            edges : (E, 2) array of node id pairs, every undirected edge listed once
+            shape : shape of the image
+
+            Returns
+            -------
+            SkeletonGraph
+        """
+        numNodes = len(coordinates)
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        sources = np.concatenate((edges[:, 0], edges[:, 1]))
+        targets = np.concatenate((edges[:, 1], edges[:, 0]))
+        order = np.lexsort((targets, sources))
+        indptr = np.zeros(numNodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=numNodes), out=indptr[1:])
+        return cls(coordinates, indptr, targets[order], shape)
+
+    def __len__(self):
+        return len(self.coordinates)
+
+    def number_of_nodes(self):
+        return len(self.coordinates)
+
+    @property
+    def degree(self):
+        return self._degree
+
+    def neighbors(self, node):
+        start = self.indptr[node]
+        return self.indices[start:start + self._degree[node]]
+
+    def _rows(self, nodes):
+        """
+            Returns the source and target node ids of all edges starting at the given nodes
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        counts = self._degree[nodes].astype(np.int64)
+        offsets = np.cumsum(counts) - counts
+        positions = np.repeat(self.indptr[nodes] - offsets, counts) + np.arange(counts.sum())
+        return np.repeat(nodes, counts), self.indices[positions]
+
+    def copy(self):
+        """
+            Returns a copy of the graph whose edges can be removed without changing this graph
+        """
+        graph = SkeletonGraph(self.coordinates, self.indptr, self.indices.copy(), self.shape, self.radii)
+        graph._degree = self._degree.copy()
+        return graph
+
+    def edges(self):
+        """
+            Returns an (E, 2) array of all edges (u, v) with u < v sorted lexicographically
+        """
+        sources, targets = self._rows(np.arange(len(self)))
+        mask = sources < targets
+        return np.stack((sources[mask], targets[mask]), axis=1)
+
+    def remove_edge(self, u, v):
+        """
+            Removes the edge between u and v in place
+        """
+        for a, b in ((u, v), (v, u)):
+            start = self.indptr[a]
+            end = start + self._degree[a]
+            pos = start + np.flatnonzero(self.indices[start:end] == b)[0]
+            self.indices[pos:end - 1] = self.indices[pos + 1:end]
+            self._degree[a] -= 1
+
+    def walk_chains(self, starts):
+        """
+            Walks from every start node over the nodes of degree 2 until a node with another degree is reached,
+            all walks advance together one node per step
+
+            Parameters
+            ----------
+            starts : array of node ids of degree 1
+
+            Returns
+            -------
+            nodes : numpy array
+                flat array of the node ids of all walks
+
+            offsets : numpy array
+                walk i consists of nodes[offsets[i]:offsets[i + 1]], from starts[i] to the first node of degree != 2
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        walks, visits = [np.arange(len(starts))], [starts]
+        previous, current = starts, self.indices[self.indptr[starts]].astype(np.int64)
+        active = np.arange(len(starts))
+        while len(active):
+            walks.append(active)
+            visits.append(current)
+            inChain = self._degree[current] == 2
+            active, previous, current = active[inChain], previous[inChain], current[inChain]
+            # continue with the neighbor which is not the previous node
+            first = self.indices[self.indptr[current]]
+            second = self.indices[self.indptr[current] + 1]
+            previous, current = current, np.where(first == previous, second, first).astype(np.int64)
+        walks, visits = np.concatenate(walks), np.concatenate(visits)
+        # the nodes of a walk were visited in order, a stable sort keeps it
+        order = np.argsort(walks, kind='stable')
+        offsets = np.zeros(len(starts) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(walks, minlength=len(starts)), out=offsets[1:])
+        return visits[order], offsets
+
+    def subgraph(self, nodes):
+        """
+            Returns the subgraph induced by the given node ids
+
+            Parameters
+            ----------
+            nodes : array of node ids
+
+            Returns
+            -------
+            SkeletonGraph with the nodes relabelled to 0..len(nodes)-1 in ascending order of their old ids
+        """
+        nodes = np.unique(np.asarray(nodes, dtype=np.int64))
+        sources, targets = self._rows(nodes)
+        # relabel neighbors with a binary search on the sorted node ids, neighbors outside of nodes are dropped
+        newTargets = np.searchsorted(nodes, targets)
+        inside = newTargets < len(nodes)
+        inside[inside] = nodes[newTargets[inside]] == targets[inside]
+        newSources = np.searchsorted(nodes, sources[inside])
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(newSources, minlength=len(nodes)), out=indptr[1:])
+        radii = None if self.radii is None else self.radii[nodes]
+        return SkeletonGraph(self.coordinates[nodes], indptr, newTargets[inside], self.shape, radii)
+
+    def remove_nodes(self, nodes):
+        """
+            Returns a new graph without the given node ids and their edges, remaining nodes are relabelled
+        """
+        keep = np.ones(len(self), dtype=bool)
+        keep[np.asarray(nodes, dtype=np.int64)] = False
+        return self.subgraph(np.flatnonzero(keep))
+
+    def connected_components(self):
+        """
+            Returns a list of node id arrays, one for each connected component ordered by their smallest node id
+        """
+        if len(self) == 0:
+            return []
+        sources, targets = self._rows(np.arange(len(self)))
+        adjacency = csr_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)), shape=(len(self), len(self)))
+        numComponents, labels = connected_components(adjacency, directed=False)
+        # stable sort keeps node ids ascending within a component, components are ordered by their first node
+        order = np.argsort(labels, kind='stable')
+        firstNodes = np.full(numComponents, len(self), dtype=np.int64)
+        np.minimum.at(firstNodes, labels, np.arange(len(self)))
+        components = np.split(order, np.cumsum(np.bincount(labels, minlength=numComponents))[:-1])
+        return [components[label] for label in np.argsort(firstNodes, kind='stable')]
+
+    def split_components(self):
+        """
+            Splits the graph into its connected components in one pass. The nodes are reordered once so that every
+            component is a contiguous block with neighbor ids local to the component, so the graph of a component
+            is a view into arrays shared by all components.
+
+            Returns
+            -------
+            components : list
+                SkeletonGraph of each component ordered by their smallest node id, nodes are relabelled in
+                ascending order of their old ids like by subgraph. Their coordinates, indices and radii are views.
+
+            firstEndPoints : numpy array
+                local id of the first node of degree 1 of each component, -1 if it has none
+        """
+        if len(self) == 0:
+            return [], np.empty(0, dtype=np.int64)
+        components = self.connected_components()
+        order = np.concatenate(components)
+        sizes = np.array([len(component) for component in components], dtype=np.int64)
+        componentStarts = np.cumsum(sizes) - sizes
+        labels = np.repeat(np.arange(len(components)), sizes)   # component of each reordered node
+        newIds = np.empty(len(self), dtype=np.int64)
+        newIds[order] = np.arange(len(self))
+
+        # neighbors of the reordered nodes relabelled to ids local to their component
+        sources, targets = self._rows(order)
+        degree = self._degree[order]
+        indices = (newIds[targets] - np.repeat(componentStarts[labels], degree)).astype(np.int32)
+        indptr = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(degree, out=indptr[1:])
+        coordinates = self.coordinates[order]
+        radii = None if self.radii is None else self.radii[order]
+
+        graphs = []
+        for start, stop in zip(componentStarts.tolist(), (componentStarts + sizes).tolist()):
+            graphs.append(SkeletonGraph(coordinates[start:stop], indptr[start:stop + 1] - indptr[start],
+                                        indices[indptr[start]:indptr[stop]], self.shape,
+                                        None if radii is None else radii[start:stop]))
+
+        # first end point of each component
+        endPts = np.flatnonzero(degree == 1)
+        firstEndPoints = np.full(len(components), -1, dtype=np.int64)
+        endPtLabels, firstIdx = np.unique(labels[endPts], return_index=True)
+        firstEndPoints[endPtLabels] = endPts[firstIdx] - componentStarts[endPtLabels]
+        return graphs, firstEndPoints
+
+    def node_tuple(self, node):
+        return tuple(self.coordinates[node].tolist())
+
+    def to_networkx(self):
+        """
+            Returns a networkx graph with voxel coordinate tuples as nodes
+        """
+        nodes = list(map(tuple, self.coordinates.tolist()))
+        networkxGraph = nx.Graph()
+        networkxGraph.add_nodes_from(nodes)
+        networkxGraph.add_edges_from((nodes[u], nodes[v]) for u, v in self.edges().tolist())
+        return networkxGraph
+
+
+class SparseRadiusMatrix:
+    """
+        Radius matrix of an image which only stores the radii at the skeleton voxels, all other voxels have radius 0
+
+        Parameters
+        ----------
+        coordinates : numpy array
+            (N, ndim) array of skeleton voxel coordinates
+
+        radii : numpy array
+            (N,) array with the radius of each skeleton voxel
+
+        shape : tuple
+            shape of the image
+
+        Examples
+        --------
+        SparseRadiusMatrix.lookup(coordinates) - radii at an (N, ndim) array of voxel coordinates
+    """
+    def __init__(self, coordinates, radii, shape):
+        self.shape = tuple(shape)
+        linearIndices = np.ravel_multi_index(np.asarray(coordinates).T, self.shape)
+        order = np.argsort(linearIndices)
+        self._linearIndices = linearIndices[order]
+        self._radii = np.asarray(radii, dtype=np.float32)[order]
+
+    def lookup(self, coordinates):
+        """
+            Returns the radii at an (N, ndim) array of coordinates
+        """
+        linearIndices = np.ravel_multi_index(np.asarray(coordinates).T, self.shape)
+        pos = np.minimum(np.searchsorted(self._linearIndices, linearIndices), max(len(self._linearIndices) - 1, 0))
+        radii = np.zeros(len(linearIndices))
+        if len(self._linearIndices):
+            found = self._linearIndices[pos] == linearIndices
+            radii[found] = self._radii[pos[found]]
+        return radii
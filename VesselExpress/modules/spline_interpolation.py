@@ -0,0 +1,135 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+from scipy import interpolate
+from geomdl import knotvector
+
+"""
+b-spline interpolation of segments for smoothing the jaggedness of the skeleton
+the curve of a segment is the product of a banded basis matrix with its points, the basis matrix only depends on the
+spline degree, the number of points and the number of curve points (delta), so it is cached and all segments of the
+same size are interpolated in one product
+"""
+
+
+# Segment interpolation functions copied from
+# https://github.com/JacobBumgarner/VesselVio/blob/main/library/feature_extraction.py
+# and adjusted degree settings
+# Build interpolation delta
+@lru_cache(maxsize=None)
+def delta_calc(num_verts, large_radius):
+    # base = 3 if num_verts > 50 else 2
+    delta = max(3, math.ceil(num_verts / math.log(num_verts, 2)))
+    if num_verts > 100 or (large_radius and num_verts > 20):
+        delta = int(delta / 2)
+    return delta
+
+
+def get_spline_degree(num_verts, spline_deg=3):
+    # Set appropriate degree of our BSpline
+    if num_verts > spline_deg + 1:
+        return spline_deg
+    return max(1, num_verts - 1)
+
+
+@lru_cache(maxsize=None)
+def get_basis(degree, num_verts, delta):
+    """
+    Return the b-spline basis functions evaluated at the curve points in banded form, at every curve point only
+    degree + 1 consecutive basis functions are nonzero
+    Parameters
+    ----------
+    degree : int
+        degree of the b-spline
+
+    num_verts : int
+        number of points (control points) of the segment
+
+    delta : int
+        number of curve points, equally spaced in the parameter range [0, 1]
+
+    Returns
+    -------
+    indices : numpy array
+        read-only (delta, degree + 1) array with the indices of the segment points weighted at each curve point
+
+    weights : numpy array
+        read-only (delta, degree + 1) array with the values of their basis functions
+    """
+    # The resources I used to learn about BSplines can be examined below:
+    # https://web.mit.edu/hyperbook/Patrikalakis-Maekawa-Cho/node17.html
+    # http://learnwebgl.brown37.net/07_cameras/points_along_a_path.html
+    # http://www.independent-software.com/determining-coordinates-on-a-html-canvas-bezier-curve.html
+    u = np.linspace(0, 1, delta, endpoint=True)  # U
+    knots = knotvector.generate(degree, num_verts)  # Knotvector
+    # knot interval of every curve point as searched by splev
+    intervals = np.clip(np.searchsorted(knots, u, side='right') - 1, degree, num_verts - 1)
+    indices = intervals[:, None] - degree + np.arange(degree + 1)
+    # evaluating the spline of every unit control point gives one basis function per column
+    basis = np.array(interpolate.splev(u, [knots, list(np.eye(num_verts)), degree])).T
+    weights = basis[np.arange(delta)[:, None], indices]
+    indices.setflags(write=False)
+    weights.setflags(write=False)
+    return indices, weights
+
+
+def _evaluate(points, indices, weights):
+    """
+    Return the curves of (..., num_verts, ndim) segment points, the weighted points are summed up in the same order
+    as splev does, so the curves are identical to evaluating each segment and coordinate with splev
+    """
+    curves = points[..., indices[:, 0], :] * weights[:, 0, None]
+    for j in range(1, indices.shape[1]):
+        curves = curves + points[..., indices[:, j], :] * weights[:, j, None]
+    return curves
+
+
+def interpolate_segments(coords, offsets, vis_radii, spline_deg=3):
+    """
+    Return the b-spline curves of many segments, segments with the same number of points and curve points are
+    interpolated together
+    Parameters
+    ----------
+    coords : numpy array
+        (N, ndim) flat array of the point coordinates of all segments
+
+    offsets : numpy array
+        segment i consists of coords[offsets[i]:offsets[i + 1]]
+
+    vis_radii : numpy array
+        average radius of each segment
+
+    spline_deg : int
+        maximum degree of the b-spline
+
+    Returns
+    -------
+    curveCoords : numpy array
+        flat array of the curve points of all segments
+
+    curveOffsets : numpy array
+        the curve of segment i consists of curveCoords[curveOffsets[i]:curveOffsets[i + 1]]
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    numVerts = np.diff(offsets)
+    # The optimal number of interpolated segment points for visualization was determined emperically as a trade-off
+    # value between ground-truth length and computational costs.
+    deltas = np.array([delta_calc(n, bool(r > 3)) for n, r in zip(numVerts.tolist(), np.asarray(vis_radii).tolist())],
+                      dtype=np.int64)
+    curveOffsets = np.zeros(len(numVerts) + 1, dtype=np.int64)
+    np.cumsum(deltas, out=curveOffsets[1:])
+    curveCoords = np.empty((curveOffsets[-1], coords.shape[1]))
+    if len(numVerts) == 0:
+        return curveCoords, curveOffsets
+
+    # group the segments by their number of points and curve points
+    sizeClasses = numVerts * (deltas.max() + 1) + deltas
+    order = np.argsort(sizeClasses, kind='stable')
+    groups = np.split(order, np.flatnonzero(np.diff(sizeClasses[order])) + 1)
+    for group in groups:
+        num_verts, delta = int(numVerts[group[0]]), int(deltas[group[0]])
+        points = coords[offsets[group][:, None] + np.arange(num_verts)].astype(np.float64)
+        curves = _evaluate(points, *get_basis(get_spline_degree(num_verts, spline_deg), num_verts, delta))
+        curveCoords[curveOffsets[group][:, None] + np.arange(delta)] = curves
+    return curveCoords, curveOffsets
@@ -0,0 +1,90 @@
+import csv
+import os
+
+import pyarrow as pa
+import pyarrow.csv as pcsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+"""
+cohort dataset of the statistics of all images
+the statistics tables of every image are stored as parquet files partitioned by the hash of the configuration and the
+image file: <dataset>/<table>/config_hash=<hash>/image_file=<image>.<ext>/part-0.parquet, so the statistics of a
+configuration or a set of images are read without opening the files of the other partitions
+"""
+
+TABLES = ('Segment_Statistics', 'Filament_Statistics', 'BranchesPerBranchPt')
+PARTITIONING = ds.partitioning(pa.schema([('config_hash', pa.string()), ('image_file', pa.string())]), flavor='hive')
+STRING_COLUMNS = {'image', 'Image', 'segmentID', 'BranchID'}
+INTEGER_COLUMNS = {'filamentID', 'FilamentID', 'terminal Points', 'branching Points', 'No. Segments',
+                   'No. Terminal Points', 'No. Branching Points', 'No. Branches per BranchPoint'}
+
+
+def readStatisticsCSV(path):
+    """
+        Read a statistics csv file as table, all other columns than the ids and counts are float64 measurements
+        with 'Null' as null
+    """
+    with open(path, newline='') as file:
+        header = next(csv.reader(file, delimiter=';'), None)
+    if header is None:
+        # image without segments
+        return pa.table({})
+    columnTypes = {name: pa.string() if name in STRING_COLUMNS else pa.int64() if name in INTEGER_COLUMNS
+                   else pa.float64() for name in header}
+    return pcsv.read_csv(path, parse_options=pcsv.ParseOptions(delimiter=';'),
+                         convert_options=pcsv.ConvertOptions(column_types=columnTypes, null_values=['Null', 'NULL'],
+                                                             strings_can_be_null=False))
+
+
+def addImage(statsPath, datasetPath, imageFile, configHash):
+    """
+        Add the statistics of an image to the dataset, the partitions of the image are replaced if they exist
+
+        Parameters
+        ----------
+        statsPath : string
+            prefix of the statistics csv files of the image, e.g. data/img.tiff
+        datasetPath : string
+        imageFile : string
+            name of the image file, e.g. img.tiff
+        configHash : string
+            hash of the configuration the statistics were computed with
+    """
+    for table in TABLES:
+        partition = os.path.join(datasetPath, table, 'config_hash=' + configHash, 'image_file=' + imageFile)
+        os.makedirs(partition, exist_ok=True)
+        pq.write_table(readStatisticsCSV(statsPath + '_' + table + '.csv'), os.path.join(partition, 'part-0.parquet'))
+
+
+def readStatistics(datasetPath, table, columns=None, filter=None):
+    """
+        Read a statistics table of the dataset, only the partitions and row groups matching the filter are read
+
+        Parameters
+        ----------
+        datasetPath : string
+        table : string
+            one of TABLES
+        columns : list, optional
+            names of the columns to read, including the partition columns 'config_hash' and 'image_file'
+        filter : pyarrow.dataset.Expression, optional
+            condition on the rows to read
+
+        Returns
+        -------
+        table : pyarrow.Table
+            the columns missing in the files of some configurations are null there
+
+        Examples
+        --------
+        readStatistics('data/statistics_dataset', 'Segment_Statistics', columns=['image_file', 'length'],
+                       filter=(ds.field('config_hash') == configHash) & ds.field('image_file').isin(images))
+    """
+    path = os.path.join(datasetPath, table)
+    dataset = ds.dataset(path, format='parquet', partitioning=PARTITIONING)
+    # the columns depend on the configuration (e.g. the experimental z angle)
+    fragments = dataset.get_fragments() if filter is None else dataset.get_fragments(filter=filter)
+    schema = pa.unify_schemas([fragment.physical_schema for fragment in fragments] + [PARTITIONING.schema])
+    dataset = ds.dataset(path, schema=schema, format='parquet', partitioning=PARTITIONING)
+    return dataset.to_table(columns=columns, filter=filter)
@@ -0,0 +1,184 @@
+import csv
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:     # pyarrow is only needed for the columnar formats
+    pa = pq = None
+
+"""
+statistics tables which are written while the filaments are processed
+every table is written as csv file and optionally as apache parquet or arrow ipc file with typed columns, rows are
+buffered in batches, so the memory of a table does not grow with the number of rows
+"""
+
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+NULL_VALUES = ('Null', 'NULL')
+
+# types of the columns in the columnar files, all other columns are measurements of type float64
+COLUMN_TYPES = {
+    'image': 'string',
+    'Image': 'string',
+    'filamentID': 'int64',
+    'FilamentID': 'int64',
+    'segmentID': 'string',
+    'BranchID': 'string',
+    'terminal Points': 'int64',
+    'branching Points': 'int64',
+    'No. Segments': 'int64',
+    'No. Terminal Points': 'int64',
+    'No. Branching Points': 'int64',
+    'No. Branches per BranchPoint': 'int64'
+}
+
+
+class StatisticsTable:
+    """
+        Table of statistics written row by row to a csv file and optionally to a columnar file
+
+        Parameters
+        ----------
+        path : string
+            path of the csv file, the columnar file has the extension of its format (.parquet or .arrow) instead
+
+        columnarFormat : string, optional
+            'parquet' or 'arrow' to write a columnar file alongside the csv file, needs pyarrow
+
+        batchSize : int
+            number of rows buffered before they are written as one row group (parquet) or record batch (arrow)
+
+        Notes
+        --------
+        The schema of the columnar file is fixed by the header, the types of the columns are given by COLUMN_TYPES.
+        'Null' values are stored as nulls, a value which does not fit the type of its column raises an error.
+    """
+    def __init__(self, path, columnarFormat=None, batchSize=65536):
+        assert columnarFormat in (None,) + COLUMNAR_FORMATS, "unknown statistics format " + str(columnarFormat)
+        if columnarFormat is not None and pa is None:
+            raise ImportError("writing " + columnarFormat + " statistics needs pyarrow")
+        self.path = path
+        self.columnarFormat = columnarFormat
+        self.columnarPath = path[:-len('.csv')] + '.' + columnarFormat if columnarFormat else None
+        self.batchSize = batchSize
+        self.columns = None
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.writer(self._file, delimiter=';')
+        self._rows = []
+        self._schema = None
+        self._columnarWriter = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def writeHeader(self, columns):
+        self.columns = list(columns)
+        self._writer.writerow(self.columns)
+        if self.columnarFormat:
+            self._schema = pa.schema([pa.field(name, pa.type_for_alias(COLUMN_TYPES.get(name, 'float64')))
+                                      for name in self.columns])
+
+    def writeRows(self, rows):
+        self._writer.writerows(rows)
+        if self.columnarFormat:
+            self._rows.extend(rows)
+            if len(self._rows) >= self.batchSize:
+                self._flush()
+
+    def _flush(self):
+        if self._columnarWriter is None:
+            if self.columnarFormat == 'parquet':
+                self._columnarWriter = pq.ParquetWriter(self.columnarPath, self._schema)
+            else:
+                self._columnarWriter = pa.ipc.new_file(self.columnarPath, self._schema)
+        arrays = []
+        for i, field in enumerate(self._schema):
+            values = [None if row[i] in NULL_VALUES else row[i] for row in self._rows]
+            if pa.types.is_string(field.type):
+                values = [None if v is None else str(v) for v in values]
+            # a cast checks that the values fit the type, e.g. that no float is truncated to an integer
+            arrays.append(pa.array(values).cast(field.type))
+        batch = pa.record_batch(arrays, schema=self._schema)
+        if self.columnarFormat == 'parquet':
+            self._columnarWriter.write_table(pa.Table.from_batches([batch]))
+        else:
+            self._columnarWriter.write_batch(batch)
+        self._rows = []
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        if self.columnarFormat:
+            if self._schema is None:
+                # table without rows, e.g. an image without segments
+                self._schema = pa.schema([])
+            self._flush()
+            self._columnarWriter.close()
+
+
+class StatisticsWriter:
+    """
+        Writes the segment, filament and branch point statistics of an image filament by filament
+
+        Parameters
+        ----------
+        path : string
+            prefix of the files, the tables are written to path + '_Segment_Statistics.csv',
+            path + '_Filament_Statistics.csv' and path + '_BranchesPerBranchPt.csv'
+
+        imgName : string
+            name of the image in the first column
+
+        columnarFormat : string, optional
+            'parquet' or 'arrow' to write every table as columnar file too
+
+        Examples
+        --------
+        with StatisticsWriter(path, imgName) as writer:
+            writer.addFilament(filamentId, segmentStats, filamentStats, brPtsDict)
+    """
+    def __init__(self, path, imgName, columnarFormat=None):
+        self.imgName = imgName
+        self.segments = StatisticsTable(path + '_Segment_Statistics.csv', columnarFormat)
+        self.filaments = StatisticsTable(path + '_Filament_Statistics.csv', columnarFormat)
+        self.branches = StatisticsTable(path + '_BranchesPerBranchPt.csv', columnarFormat)
+        self.filaments.writeHeader(["Image", "FilamentID", "No. Segments", "No. Terminal Points",
+                                    "No. Branching Points"])
+        self.branches.writeHeader(["Image", "FilamentID", "BranchID", "No. Branches per BranchPoint"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def addFilament(self, filamentId, segmentStats, filamentStats, brPtsDict):
+        """
+            Writes the statistics of a filament
+
+            Parameters
+            ----------
+            filamentId : int
+            segmentStats : dict
+                statistics of each segment with the segment key as key
+            filamentStats : dict
+                number of 'Segments', 'TerminalPoints' and 'BranchPoints' of the filament
+            brPtsDict : dict
+                number of branches of each branch point
+        """
+        if segmentStats and self.segments.columns is None:
+            # the measurements of the first segment determine the columns
+            self.segments.writeHeader(["image", "filamentID", "segmentID"] + list(next(iter(segmentStats.values()))))
+        self.segments.writeRows([[self.imgName, filamentId, segment] + list(stats.values())
+                                 for segment, stats in segmentStats.items()])
+        self.filaments.writeRows([[self.imgName, filamentId, filamentStats["Segments"],
+                                   filamentStats["TerminalPoints"], filamentStats["BranchPoints"]]])
+        self.branches.writeRows([[self.imgName, filamentId, brPt, branches] for brPt, branches in brPtsDict.items()])
+
+    def close(self):
+        self.segments.close()
+        self.filaments.close()
+        self.branches.close()
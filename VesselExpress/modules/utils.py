@@ -1,12 +1,22 @@
 import csv
+import numpy as np
 from mpl_toolkits.mplot3d import Axes3D
 import matplotlib.pyplot as plt
 from ast import literal_eval as make_tuple
 from collections import defaultdict
 import imageio
 import tifffile
+import zarr
+from numcodecs import Blosc
 import os
 
+# chunk edge length and compressor of masks written as zarr store, bit shuffling packs the bool voxels to bits
+ZARR_CHUNK_SIZE = 128
+ZARR_COMPRESSOR = Blosc(cname='zstd', clevel=5, shuffle=Blosc.BITSHUFFLE)
+# zarr >= 3 writes the v3 format by default, which does not take a numcodecs compressor, so masks are written in the
+# v2 format with every zarr version. The stores can then be read by zarr 2 and 3.
+ZARR_FORMAT_ARGS = {'zarr_format': 2} if int(zarr.__version__.split('.')[0]) >= 3 else {}
+
 
 def saveAllStatsAsCSV(dictionary, path, imgName):
     # get all segment measurements as list from dictionary
@@ -64,6 +74,15 @@ def saveEndPtsRelativeAsCSV(value, path, imgName):
         writer = csv.writer(file, delimiter=';')
         writer.writerows(list)
 
+def saveSweepParametersAsCSV(parameterSets, names, path):
+    list = [["Parameter Set"] + names]
+    for idx, parameters in enumerate(parameterSets):
+        list_item = [idx] + [parameters[name] for name in names]
+        list.append(list_item)
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file, delimiter=';')
+        writer.writerows(list)
+
 def saveSegmentDictAsCSV(dictionary, path, measurementTitle, measurement, unit="", category="Segment"):
     """
         Save a dictionary with measurements as csv file
@@ -169,7 +188,7 @@ def plotSegStats(segmentsDict, brPtsDict, endPtsDict):
             Y = [item[1] for item in segmentsDict[filament][branch]]
             X = [item[2] for item in segmentsDict[filament][branch]]
             ax.plot(X, Y, Z, 'k')
-            for point in segmentsDict[filament][branch]:
+            for point in map(tuple, np.asarray(segmentsDict[filament][branch]).tolist()):
                 # nodes
                 if point in brPtsDict[filament]:
                     ax.scatter(point[2], point[1], point[0], c='r', marker='o')
@@ -218,13 +237,42 @@ def getSegmentsDictFromFile(segmentsFile, fullSegDict, filamentNo):
 
     return segDict
 
-def read_img(filepath):
-    extension = os.path.splitext(filepath)[1]
-    if extension == '.tiff' or extension == '.tif':
+def read_img(filepath, lazy=False, dtype=None):
+    """
+        Read an image file
+
+        Parameters
+        ----------
+        filepath : string
+            path of a TIFF file, a zarr store or another image file readable by imageio
+        lazy : bool
+            if True the image is read from disk only where it is accessed: uncompressed TIFF files are memory-mapped,
+            compressed TIFF files and zarr stores are returned as read-only zarr arrays, other files are read at once
+        dtype : numpy dtype, optional
+            type of the returned image, bool returns the mask of the nonzero pixels. A lazy image of another type is
+            read at once to be converted
+
+        Returns
+        -------
+        img : numpy array, numpy memmap or zarr array
+    """
+    extension = os.path.splitext(filepath.rstrip(os.sep))[1]
+    if extension == '.zarr':
+        img = zarr.open(filepath, mode='r')
+        if not lazy:
+            img = img[...]
+    elif (extension == '.tiff' or extension == '.tif') and lazy:
+        try:
+            img = tifffile.memmap(filepath, mode='r')
+        except ValueError:  # compressed or not contiguous image data can not be memory-mapped
+            img = zarr.open(tifffile.imread(filepath, aszarr=True), mode='r')
+    elif extension == '.tiff' or extension == '.tif':
         img = tifffile.imread(filepath)
     else:
         img = imageio.imread(filepath)
-    return img
+    if dtype is None or img.dtype == dtype:
+        return img
+    return np.asarray(img).astype(dtype)
 
 
 def write_img(img, filepath):
@@ -234,3 +282,39 @@ def write_img(img, filepath):
     else:
         imageio.imwrite(filepath, img)
 
+
+def write_mask(mask, filepath, axes=None):
+    """
+        Write a binary mask, TIFF files store it as bilevel image with 1 bit per voxel/pixel (packed like
+        np.packbits), zarr stores as chunked and compressed bool array and other formats as uint8 with 0 and 255.
+        read_img(filepath, dtype=bool) reads it as bool mask.
+        A 1-bit TIFF file can not be memory-mapped, read_img(filepath, lazy=True) reads it page by page, so reading
+        small boxes decodes whole pages. Masks which are read partially, e.g. in small RAM mode, are best written to
+        zarr stores.
+
+        Parameters
+        ----------
+        mask : numpy array or dask array
+            mask of the nonzero voxels/pixels, a dask array is written to a zarr store chunk by chunk
+        filepath : string
+        axes : string, optional
+            axes of the mask, e.g. 'ZYX', a TIFF file is then written as OME-TIFF with the axes in its OME-XML
+    """
+    extension = os.path.splitext(filepath.rstrip(os.sep))[1]
+    if extension == '.zarr':
+        store = zarr.open(filepath, mode='w', shape=mask.shape, dtype=bool, compressor=ZARR_COMPRESSOR,
+                          chunks=tuple(min(ZARR_CHUNK_SIZE, n) for n in mask.shape), **ZARR_FORMAT_ARGS)
+        if hasattr(mask, 'store'):  # dask array
+            mask.astype(bool).store(store)
+        else:
+            store[...] = np.asarray(mask).astype(bool, copy=False)
+        return
+    mask = np.asarray(mask).astype(bool, copy=False)
+    if extension == '.tiff' or extension == '.tif':
+        if axes is None:
+            tifffile.imwrite(filepath, mask, photometric='minisblack')
+        else:
+            tifffile.imwrite(filepath, mask, photometric='minisblack', ome=True, metadata={'axes': axes})
+    else:
+        imageio.imwrite(filepath, mask.astype(np.uint8) * 255)
+
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from scipy.ndimage import gaussian_filter
+from skimage.morphology import skeletonize
+
+# the modules are imported by their names like in the workflow scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'modules'))
+
+
+def make_segmentation(shape, seed, sigma=2.0, fraction=0.25):
+    """
+        Returns a binary image of smoothed random noise with about the given fraction of foreground voxels
+    """
+    noise = gaussian_filter(np.random.default_rng(seed).random(shape), sigma)
+    return (noise > np.quantile(noise, 1 - fraction)).astype(np.uint8)
+
+
+def make_skeleton(segmentation):
+    return (skeletonize(segmentation, method='lee') > 0).astype(np.uint8)
+
+
+@pytest.fixture(scope='session')
+def segmentation():
+    return make_segmentation((24, 64, 64), seed=0)
+
+
+@pytest.fixture(scope='session')
+def skeleton(segmentation):
+    return make_skeleton(segmentation)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from scipy import ndimage
+
+import distance_transform as dt
+
+SAMPLING = [2.0, 1.015625, 1.015625]
+
+
+@pytest.mark.parametrize('tileSize, workers', [(8, 1), (16, 3), (128, 1)])
+def test_tiled_distances_at_skeleton_equal_full_transform(segmentation, skeleton, tileSize, workers):
+    coordinates = np.argwhere(skeleton)
+    full = ndimage.distance_transform_edt(segmentation, sampling=SAMPLING)[tuple(coordinates.T)].astype(np.float32)
+    # the overlap of max_radius covers the largest distance, so every box contains the closest background voxel
+    distances = dt.distance_transform_at(segmentation, coordinates, SAMPLING, mode='tiled', max_radius=30,
+                                         tile_size=tileSize, workers=workers)
+    assert distances.dtype == np.float32
+    np.testing.assert_array_equal(distances, full)
+
+
+def test_distances_of_foreground_box_without_background():
+    # the box around the coordinates contains no background, it has to be padded until it does
+    image = np.ones((40, 40), dtype=np.uint8)
+    image[0] = 0
+    coordinates = np.array([[30, 20], [35, 21]])
+    distances = dt.distance_transform_at(image, coordinates, [1, 1], mode='tiled', max_radius=1, tile_size=64)
+    np.testing.assert_array_equal(distances, [30, 35])
+
+
+def test_no_coordinates(segmentation):
+    distances = dt.distance_transform_at(segmentation, np.empty((0, 3), dtype=np.int64), SAMPLING)
+    assert distances.shape == (0,) and distances.dtype == np.float32
+
+
+def test_distance_transform_edt_is_float32_scipy_transform(segmentation):
+    distances = dt.distance_transform_edt(segmentation, SAMPLING)
+    assert distances.dtype == np.float32
+    np.testing.assert_array_equal(distances,
+                                  ndimage.distance_transform_edt(segmentation, sampling=SAMPLING).astype(np.float32))
+
+
+@pytest.mark.parametrize('maxRadius', [1, 2, 15])
+@pytest.mark.parametrize('tileSize, workers', [(8, 1), (16, 3)])
+def test_two_pass_distances_equal_exact_distances(segmentation, skeleton, maxRadius, tileSize, workers):
+    coordinates = np.argwhere(skeleton)
+    exact = dt.distance_transform_at(segmentation, coordinates, SAMPLING, mode='exact')
+    twoPass = dt.distance_transform_at(segmentation, coordinates, SAMPLING, mode='two_pass', max_radius=maxRadius,
+                                       tile_size=tileSize, workers=workers)
+    np.testing.assert_array_equal(twoPass, exact)
+
+
+def test_tiled_distances_larger_than_overlap_are_overestimated(segmentation, skeleton):
+    coordinates = np.argwhere(skeleton)
+    exact = dt.distance_transform_at(segmentation, coordinates, SAMPLING, mode='exact')
+    tiled = dt.distance_transform_at(segmentation, coordinates, SAMPLING, mode='tiled', max_radius=1, tile_size=8)
+    assert np.all(tiled >= exact) and np.any(tiled > exact)
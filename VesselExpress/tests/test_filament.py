@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+import filament as fil
+import measurements as ms
+import networkx_graph_from_array as netGrArr
+
+from conftest import make_segmentation, make_skeleton
+
+PIXEL_DIMENSIONS = [2.0, 1.015625, 1.015625]
+
+
+def get_filaments(skeleton, seed=0):
+    """
+        Returns the graph and first end point of every filament of a skeleton, the nodes get random radii
+    """
+    skeletonGraph = netGrArr.get_skeleton_graph_from_array(skeleton)
+    skeletonGraph.radii = np.random.default_rng(seed).uniform(0.5, 3, len(skeletonGraph)).astype(np.float32)
+    graphs, starts = skeletonGraph.split_components()
+    return [(graph, start) for graph, start in zip(graphs, starts.tolist()) if start != -1]
+
+
+def make_filament(graph, start, lengthLimit=3, diaScale=2, branchingThreshold=0.25, interpolate=0,
+                  cut_neighbor_brpt_segs=1):
+    return fil.Filament(graph, start, graph.radii, PIXEL_DIMENSIONS, lengthLimit, diaScale, branchingThreshold,
+                        expFlag=0, smallRAMmode=0, fileName='test', removeBorderEndPts=0,
+                        removeEndPtsFromSmallFilaments=0, interpolate=interpolate, splineDegree=3,
+                        cut_neighbor_brpt_segs=cut_neighbor_brpt_segs)
+
+
+def random_skeleton(seed):
+    # skeleton of random noise with many branch points and cycles
+    return make_skeleton(np.random.default_rng(seed).random((12, 30, 30)) < 0.35)
+
+
+def get_skeleton(seed, smooth):
+    # segments of the skeleton of a smooth segmentation are merged more often in postprocessing
+    return make_skeleton(make_segmentation((24, 64, 64), seed)) if smooth else random_skeleton(seed)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_chain_decomposition_equals_predecessor_walk(seed):
+    numSegments = 0
+    for graph, start in get_filaments(random_skeleton(seed)):
+        filament = make_filament(graph, start)
+        nodes, offsets, predSegments = filament._decomposeChains()
+        segments = [nodes[a:b].tolist() for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+        degree = graph.degree
+        edges = []
+        for i, segment in enumerate(segments):
+            # a segment is a path from a branch or end point over nodes of degree 2 to a branch or end point
+            assert degree[segment[0]] != 2 and degree[segment[-1]] != 2
+            assert all(degree[node] == 2 for node in segment[1:-1])
+            assert all(v in graph.neighbors(u) for u, v in zip(segment[:-1], segment[1:]))
+            edges += [tuple(sorted(edge)) for edge in zip(segment[:-1], segment[1:])]
+            # a segment found at a branch or end point is the chain of its predecessors, otherwise it closes a cycle
+            if filament._predDict.get(segment[-1]) == segment[-2]:
+                assert filament._getSegment(segment[-1]) == segment
+            else:
+                assert degree[segment[-1]] > 2
+            # the predecessor segment ends at the first node of the segment
+            if segment[0] == start:
+                assert predSegments[i] == -1
+            else:
+                assert segments[predSegments[i]][-1] == segment[0]
+                assert filament._getSegment(segment[0]) == segments[predSegments[i]]
+        # every edge belongs to exactly one segment
+        assert sorted(edges) == sorted(map(tuple, graph.edges().tolist()))
+        numSegments += len(segments)
+    assert numSegments > 0
+
+
+class IndexCheckingFilament(fil.Filament):
+    """
+        Filament which checks the postprocessing indexes against a scan of all segments after every removal
+    """
+    def _removeSegments(self, keys):
+        super()._removeSegments(keys)
+        assert set(self._segmentIds) == set(self.segmentsDict) == set(self.segmentStats)
+        assert len(set(self._segmentIds.values())) == len(self._segmentIds)
+        for node in range(len(self.graph)):
+            assert self._incidentSegments.get(node, set()) == {key for key in self.segmentsDict if node in key}
+        degree = self.graph.degree
+        assert all(degree[endPt] == 1 for endPt in self._endPts)
+        assert all(degree[brPt] > 2 for brPt in self.brPtsDict)
+        for segment in self.segmentsDict.values():
+            assert all(v in self.graph.neighbors(u) for u, v in zip(segment[:-1], segment[1:]))
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('smooth', [False, True])
+@pytest.mark.parametrize('lengthLimit, cut_neighbor_brpt_segs', [(3, 1), (3, 0), (8, 1)])
+def test_postprocessing_indexes_equal_segment_scan(seed, smooth, lengthLimit, cut_neighbor_brpt_segs):
+    removed = 0
+    for graph, start in get_filaments(get_skeleton(seed, smooth), seed):
+        filament = IndexCheckingFilament(graph, start, graph.radii, PIXEL_DIMENSIONS, lengthLimit, 2, 0.25, expFlag=0,
+                                         smallRAMmode=0, fileName='test', removeBorderEndPts=0,
+                                         removeEndPtsFromSmallFilaments=0, interpolate=0, splineDegree=3,
+                                         cut_neighbor_brpt_segs=cut_neighbor_brpt_segs)
+        filament.dfs_iterative()
+        removed += filament.postprocBranches
+    assert removed > 0
+
+
+class CacheCheckingFilament(fil.Filament):
+    """
+        Filament which checks every cached predecessor vector against the vector of the current predecessor segment
+    """
+    checkedVectors = 0
+
+    def _getPredecessorVector(self, node):
+        vector = super()._getPredecessorVector(node)
+        segment = self._getSegment(node)
+        if segment is None:
+            assert vector is None
+        else:
+            np.testing.assert_array_equal(vector, ms.getPredecessorVectors(
+                self.graph.coordinates[segment], np.array([0, len(segment)]), self.pixelDims, self.branchingThr))
+            CacheCheckingFilament.checkedVectors += 1
+        # a second lookup is answered by the cache
+        assert super()._getPredecessorVector(node) is vector
+        return vector
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('branchingThreshold', [0, 0.25, 0.5, 1])
+def test_cached_predecessor_vectors_equal_predecessor_segments(seed, branchingThreshold):
+    CacheCheckingFilament.checkedVectors = 0
+    for graph, start in get_filaments(get_skeleton(seed, smooth=True), seed):
+        filament = CacheCheckingFilament(graph, start, graph.radii, PIXEL_DIMENSIONS, 3, 2, branchingThreshold,
+                                         expFlag=0, smallRAMmode=0, fileName='test', removeBorderEndPts=0,
+                                         removeEndPtsFromSmallFilaments=0, interpolate=0, splineDegree=3,
+                                         cut_neighbor_brpt_segs=1)
+        filament.dfs_iterative()
+    assert CacheCheckingFilament.checkedVectors > 0
@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+
+import graph
+import measurements as ms
+import networkx_graph_from_array as netGrArr
+
+from conftest import make_skeleton
+
+PIXEL_DIMENSIONS = [2.0, 1.015625, 1.015625]
+
+
+def compute_stats(segmentation, skeleton, smallRAMmode=0, numWorkers=1, edtMode='two_pass', maxRadius=15,
+                  fileName='test'):
+    skeletonGraph = netGrArr.get_skeleton_graph_from_array(skeleton)
+    stats = graph.Graph(segmentation, skeleton, skeletonGraph, PIXEL_DIMENSIONS, pruningScale=1.5, lengthLimit=3,
+                        diaScale=2, branchingThreshold=0.25, expFlag=1, smallRAMmode=smallRAMmode, infoFile=None,
+                        graphCreation=1, fileName=fileName, removeBorderEndPts=0, removeEndPtsFromSmallFilaments=0,
+                        interpolate=1, splineDegree=3, cut_neighbor_brpt_segs=1, numWorkers=numWorkers,
+                        edtMode=edtMode, maxRadius=maxRadius)
+    stats.setStats()
+    return stats
+
+
+def assert_same_stats(stats, other):
+    # assert_equal treats nan values at the same place as equal
+    np.testing.assert_equal(dict(stats.segStatsDict), dict(other.segStatsDict))
+    np.testing.assert_equal(dict(stats.filStatsDict), dict(other.filStatsDict))
+    np.testing.assert_equal(dict(stats.branchesBrPtDict), dict(other.branchesBrPtDict))
+    np.testing.assert_array_equal(stats.skeleton, other.skeleton)
+    assert stats.infoDict == other.infoDict
+
+
+@pytest.mark.parametrize('smallRAMmode', [0, 1])
+def test_parallel_stats_equal_serial_stats(segmentation, skeleton, tmp_path, monkeypatch, smallRAMmode):
+    # small RAM mode writes the distance transform to tmp_zarr in the working directory
+    monkeypatch.chdir(tmp_path)
+    serial = compute_stats(segmentation, skeleton, smallRAMmode, fileName='serial')
+    assert len(serial.segStatsDict) > 1
+    assert_same_stats(compute_stats(segmentation, skeleton, smallRAMmode, numWorkers=2, fileName='parallel'), serial)
+
+
+@pytest.mark.parametrize('maxRadius', [1, 2, 15])
+def test_two_pass_stats_equal_exact_stats(segmentation, skeleton, maxRadius):
+    exact = compute_stats(segmentation, skeleton, edtMode='exact')
+    assert_same_stats(compute_stats(segmentation, skeleton, edtMode='two_pass', maxRadius=maxRadius), exact)
+
+
+def prune(skeletonGraph, radii, pruningScale, iterativePruning):
+    """
+        Prunes a copy of the skeleton graph with the given radii, the distance transform is skipped
+    """
+    skeletonGraph = skeletonGraph.copy()
+    skeletonGraph.radii = radii
+    return graph.Graph(None, None, skeletonGraph, PIXEL_DIMENSIONS, pruningScale=pruningScale, lengthLimit=3,
+                       diaScale=2, branchingThreshold=0.25, expFlag=0, smallRAMmode=0, infoFile=None, graphCreation=0,
+                       fileName='test', removeBorderEndPts=0, removeEndPtsFromSmallFilaments=0, interpolate=0,
+                       splineDegree=3, cut_neighbor_brpt_segs=1, iterativePruning=iterativePruning)
+
+
+def reference_prune(skeletonGraph, radii, pruningScale):
+    """
+        Prunes the networkx graph of a skeleton graph branch by branch, returns the pruned graph and the number of
+        pruned branches
+    """
+    networkxGraph = skeletonGraph.to_networkx()
+    radiusMat = dict(zip(map(tuple, skeletonGraph.coordinates.tolist()), radii.tolist()))
+    branchesToRemove = []
+    for endPt in [node for node, degree in networkxGraph.degree if degree == 1]:
+        visited, stack, branch = set(), [endPt], []
+        while stack:
+            vertex = stack.pop()
+            if vertex not in visited:
+                visited.add(vertex)
+                branch.append(vertex)
+                neighbors = list(networkxGraph.neighbors(vertex))
+                stack.extend(neighbor for neighbor in neighbors if neighbor not in visited)
+                if len(neighbors) > 2:  # branch point found
+                    if ms.getLength(branch, PIXEL_DIMENSIONS) <= radiusMat[vertex] * pruningScale:
+                        branchesToRemove.append(branch)
+                    break
+    for branch in branchesToRemove:
+        networkxGraph.remove_nodes_from(branch[:-1])
+    return networkxGraph, len(branchesToRemove)
+
+
+def random_skeleton_graph(seed):
+    rng = np.random.default_rng(seed)
+    skeletonGraph = netGrArr.get_skeleton_graph_from_array(make_skeleton(rng.random((16, 40, 40)) < 0.35))
+    return skeletonGraph, rng.uniform(0, 4, len(skeletonGraph)).astype(np.float32)
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('pruningScale', [1.5, 3, 10])
+def test_pruning_equals_branch_by_branch_pruning(seed, pruningScale):
+    skeletonGraph, radii = random_skeleton_graph(seed)
+    pruned = prune(skeletonGraph, radii, pruningScale, iterativePruning=0)
+    reference, numPruned = reference_prune(skeletonGraph, radii, pruningScale)
+    assert pruned.infoDict['pruning'] == numPruned > 0
+    networkxGraph = pruned.skeletonGraph.to_networkx()
+    assert set(networkxGraph.nodes) == set(reference.nodes)
+    assert {frozenset(edge) for edge in networkxGraph.edges} == {frozenset(edge) for edge in reference.edges}
+
+
+def linear_indices(skeletonGraph):
+    return np.ravel_multi_index(skeletonGraph.coordinates.T, skeletonGraph.shape)
+
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('pruningScale', [1.5, 3, 10])
+def test_iterative_pruning_equals_repeated_pruning(seed, pruningScale):
+    skeletonGraph, radii = random_skeleton_graph(seed)
+    iterative = prune(skeletonGraph, radii, pruningScale, iterativePruning=1)
+
+    # prune single passes until nothing is removed, the radii of the removed nodes are dropped
+    pruned = 0
+    while True:
+        single = prune(skeletonGraph, radii, pruningScale, iterativePruning=0)
+        if single.infoDict['pruning'] == 0:
+            break
+        pruned += single.infoDict['pruning']
+        radii = radii[np.isin(linear_indices(skeletonGraph), linear_indices(single.skeletonGraph))]
+        skeletonGraph = single.skeletonGraph
+
+    assert pruned == iterative.infoDict['pruning'] > 0
+    np.testing.assert_array_equal(iterative.skeletonGraph.coordinates, skeletonGraph.coordinates)
+    np.testing.assert_array_equal(iterative.skeletonGraph.edges(), skeletonGraph.edges())
@@ -0,0 +1,84 @@
+import csv
+import os
+import sys
+
+import numpy as np
+import pytest
+import tifffile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'workflow', 'scripts'))
+
+import graphAnalysis
+import utils
+
+PARAMETERS = {
+    "pixel_dimensions": [2.0, 1.015625, 1.015625],
+    "pruning_scale": 1.5,
+    "length_limit": 3,
+    "dia_scale": 2,
+    "branching_threshold": 0.25,
+    "extended_output": 0,
+    "experimental_flag": 0,
+    "remove_border_end_pts": 0,
+    "remove_end_pts_from_small_filaments": 0,
+    "seg_interpolate": 1,
+    "spline_degree": 3,
+    "cut_neighbor_brpt_segs": 1,
+    "small_RAM_mode": 0,
+    "sparse_graph": 1,
+    "graph_tile_size": 0,
+    "num_workers": 1,
+    "edt_mode": "two_pass",
+    "max_radius": 15,
+    "iterative_pruning": 0,
+    "columnar_format": "none"
+}
+TABLES = ['_Segment_Statistics.csv', '_Filament_Statistics.csv', '_BranchesPerBranchPt.csv']
+
+
+def write_images(directory, segmentation, skeleton):
+    """
+        Writes the images like the pipeline to <directory>/img and returns the paths of the skeleton and binary image
+    """
+    imageDir = directory / 'img'
+    imageDir.mkdir(parents=True)
+    tifffile.imwrite(str(imageDir / 'Skeleton_img.tif'), skeleton * 255)
+    tifffile.imwrite(str(imageDir / 'Binary_img.tif'), segmentation * 255)
+    return str(imageDir / 'Skeleton_img.tif'), str(imageDir / 'Binary_img.tif')
+
+
+def read_table(path):
+    with open(path, newline='') as file:
+        return list(csv.reader(file, delimiter=';'))
+
+
+@pytest.mark.parametrize('numWorkers', [1, 2])
+def test_sweep_statistics_equal_single_runs(segmentation, skeleton, tmp_path, numWorkers):
+    sweep = {"pruning_scale": [1, 3], "length_limit": [2, 6]}
+    skelImg, binImg = write_images(tmp_path / 'sweep', segmentation, skeleton)
+    graphAnalysis.sweepParameters(skelImg, binImg, dict(PARAMETERS, num_workers=numWorkers), sweep)
+    sweepDir = tmp_path / 'sweep' / 'img' / 'sweep'
+    assert read_table(str(sweepDir / 'Sweep_Parameters.csv')) == [
+        ['Parameter Set', 'pruning_scale', 'length_limit'], ['0', '1', '2'], ['1', '1', '6'], ['2', '3', '2'],
+        ['3', '3', '6']]
+
+    for idx, (pruningScale, lengthLimit) in enumerate([(1, 2), (1, 6), (3, 2), (3, 6)]):
+        runDir = tmp_path / ('set_' + str(idx))
+        skelImg, binImg = write_images(runDir, segmentation, skeleton)
+        graphAnalysis.processImage(skelImg, binImg, dict(PARAMETERS, pruning_scale=pruningScale,
+                                                         length_limit=lengthLimit))
+        for table in TABLES:
+            single = read_table(str(runDir / 'img.tif') + table)
+            assert len(single) > 1
+            assert read_table(str(sweepDir / ('set_' + str(idx))) + table) == single
+
+
+@pytest.mark.parametrize('smallRAMmode', [0, 1])
+def test_read_bilevel_tiff_mask(segmentation, skeleton, tmp_path, smallRAMmode):
+    # a 1-bit TIFF is only read page by page, it is read at once unless small RAM mode restricts the memory
+    skelImg, binImg = str(tmp_path / 'Skeleton_img.tif'), str(tmp_path / 'Binary_img.tif')
+    utils.write_mask(segmentation, binImg)
+    utils.write_mask(skeleton, skelImg)
+    binImage, _ = graphAnalysis.readImages(skelImg, binImg, dict(PARAMETERS, small_RAM_mode=smallRAMmode))
+    assert isinstance(binImage, np.ndarray) != bool(smallRAMmode)
+    np.testing.assert_array_equal(binImage[...], segmentation > 0)
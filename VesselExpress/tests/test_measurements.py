@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+
+import measurements as ms
+
+from test_filament import get_filaments, make_filament, random_skeleton
+
+PIXEL_DIMENSIONS = [2.0, 1.015625, 1.015625]
+
+
+def branching_angle(segPredList, segment, factor, dimensions):
+    """
+        Returns the branching angle between a segment and its predecessor for lists of coordinate tuples like the
+        scalar computation of a single segment
+    """
+    segPredList = segPredList[::-1]
+    if factor <= 0:
+        segPredPt = segPredList[1]
+        segPt = segment[1]
+    elif factor == 0.5:
+        segPredPt = segPredList[int(len(segPredList) * factor)]
+        segPt = segment[int(len(segment) * factor)]
+    elif factor >= 1:
+        segPredPt = segPredList[len(segPredList) - 1]
+        segPt = segment[len(segment) - 2] if segment[len(segment) - 1] == segment[0] else segment[len(segment) - 1]
+    else:
+        # the point chosen by the factor is at most the last point of the segment
+        if round(len(segPredList) * factor) == 0 or len(segPredList) == 2:
+            segPredPt = segPredList[1]
+        else:
+            segPredPt = segPredList[min(round(len(segPredList) * factor), len(segPredList) - 1)]
+        if round(len(segment) * factor) == 0 or len(segment) == 2:
+            segPt = segment[1]
+        else:
+            segPt = segment[min(round(len(segment) * factor), len(segment) - 1)]
+            if segPt == segment[0]:     # in case of a circle, take pre-last point
+                segPt = segment[len(segment) - 2]
+    segPredVect = [(j - i) * d for i, j, d in zip(segPredPt, segment[0], dimensions)]
+    segVect = [(j - i) * d for i, j, d in zip(segment[0], segPt, dimensions)]
+    cosine_angle = np.dot(segPredVect, segVect) / (np.linalg.norm(segPredVect) * np.linalg.norm(segVect))
+    return round(np.degrees(np.arccos(round(cosine_angle, 4))), 4)
+
+
+def get_segments(seed):
+    """
+        Returns the segments of the filaments of a random skeleton as flat coordinate and radius arrays with their
+        offsets and predecessor segments
+    """
+    coords, radii, offsets, predSegments = [], [], [0], []
+    for graph, start in get_filaments(random_skeleton(seed), seed):
+        nodes, segmentOffsets, preds = make_filament(graph, start)._decomposeChains()
+        predSegments.append(np.where(preds < 0, -1, preds + len(offsets) - 1))
+        coords.append(graph.coordinates[nodes])
+        radii.append(graph.radii[nodes])
+        offsets += (segmentOffsets[1:] + offsets[-1]).tolist()
+    return np.concatenate(coords), np.concatenate(radii), np.array(offsets), np.concatenate(predSegments)
+
+
+def as_list(coords, offsets, i):
+    return [tuple(point) for point in coords[offsets[i]:offsets[i + 1]].tolist()]
+
+
+@pytest.mark.parametrize('factor', [0, 0.25, 0.5, 0.75, 0.9, 1])
+def test_segment_stats_equal_scalar_stats(factor):
+    coords, radii, offsets, predSegments = get_segments(seed=1)
+    meanRadii = ms.getMeanRadii(radii, offsets)
+    stats = ms.getSegmentStats(coords, offsets, meanRadii, PIXEL_DIMENSIONS, predSegments, factor)
+    for i in range(len(offsets) - 1):
+        segment = as_list(coords, offsets, i)
+        length = ms.getLength(segment, PIXEL_DIMENSIONS)
+        radius = ms.getRadius(radii, range(offsets[i], offsets[i + 1]))
+        displacement = np.linalg.norm((np.array(segment[-1]) - segment[0]) * PIXEL_DIMENSIONS)
+        np.testing.assert_allclose(stats['length'][i], length, rtol=1e-12)
+        np.testing.assert_allclose(stats['diameter'][i], radius * 2, rtol=1e-12)
+        np.testing.assert_allclose(stats['straightness'][i], displacement / length, rtol=1e-12)
+        np.testing.assert_allclose(stats['volume'][i], ms.getVolumeCylinder(meanRadii[i], length), rtol=1e-12)
+        if predSegments[i] < 0:
+            assert np.isnan(stats['branchingAngle'][i])
+        else:
+            angle = branching_angle(as_list(coords, offsets, predSegments[i]), segment, factor, PIXEL_DIMENSIONS)
+            np.testing.assert_allclose(stats['branchingAngle'][i], angle, atol=1e-9)
+
+
+@pytest.mark.parametrize('factor', [0.75, 0.9])
+def test_branching_angles_of_short_segments(factor):
+    # a predecessor and three segments of 3 or 4 points starting at its branching point (0, 2), the last one is a
+    # circle, the point chosen by the factor may not lie beyond the end of a segment
+    coords = np.array([[0, 0], [0, 1], [0, 2],
+                       [0, 2], [1, 3], [2, 4],
+                       [0, 2], [1, 2], [1, 3], [0, 2],
+                       [0, 2], [-1, 2], [-2, 2]])
+    offsets = np.array([0, 3, 6, 10, 13])
+    predSegments = np.array([-1, 0, 0, 0])
+    stats = ms.getSegmentStats(coords, offsets, np.ones(4), [1, 1], predSegments, factor)
+    for i in range(1, 4):
+        assert stats['branchingAngle'][i] == branching_angle(as_list(coords, offsets, 0), as_list(coords, offsets, i),
+                                                              factor, [1, 1])
+    # 45 degrees of the cosine rounded to 4 decimals
+    np.testing.assert_array_equal(stats['branchingAngle'][1:], [45.0005, 45.0005, 90])
+
+
+def segments_and_radii(seed):
+    coords, _, offsets, _ = get_segments(seed)
+    radiusMatrix = np.random.default_rng(seed).uniform(0, 4, coords.max(axis=0) + 1)
+    return coords, offsets, radiusMatrix
+
+
+def test_batch_lengths_volumes_and_radii_equal_scalar_functions():
+    coords, offsets, radiusMatrix = segments_and_radii(seed=2)
+    radii = radiusMatrix[tuple(coords.T)]
+    lengths = ms.getLengths(coords, PIXEL_DIMENSIONS, offsets)
+    volumes = ms.getVolumes(radii, coords, PIXEL_DIMENSIONS, offsets)
+    meanRadii = ms.getMeanRadii(radii, offsets)
+    for i in range(len(offsets) - 1):
+        segment = as_list(coords, offsets, i)
+        assert lengths[i] == ms.getLength(segment, PIXEL_DIMENSIONS)
+        np.testing.assert_allclose(volumes[i], ms.getVolume(radiusMatrix, segment, PIXEL_DIMENSIONS), rtol=1e-12)
+        assert meanRadii[i] == ms.getRadius(radiusMatrix, segment)
+    # a single segment without offsets
+    segment = as_list(coords, offsets, 0)
+    assert ms.getLengths(coords[:offsets[1]], PIXEL_DIMENSIONS)[0] == ms.getLength(segment, PIXEL_DIMENSIONS)
+
+
+def test_batch_z_angles_equal_scalar_z_angles():
+    coords, offsets, _ = segments_and_radii(seed=3)
+    angles = ms.get_z_angles(coords, PIXEL_DIMENSIONS, offsets)
+    for i in range(len(offsets) - 1):
+        np.testing.assert_allclose(angles[i], ms.get_z_angle(as_list(coords, offsets, i), PIXEL_DIMENSIONS),
+                                   atol=1e-9)
@@ -0,0 +1,158 @@
+import itertools
+
+import networkx as nx
+import numpy as np
+import pytest
+import tifffile
+
+import networkx_graph_from_array as netGrArr
+import utils
+
+from conftest import make_segmentation, make_skeleton
+
+
+def neighborhood_edges(binary_arr):
+    """
+        Returns the edges between all nonzero voxels in their second order neighborhood as set of coordinate pairs
+    """
+    nodes = {tuple(node) for node in np.argwhere(binary_arr).tolist()}
+    steps = [step for step in itertools.product((-1, 0, 1), repeat=binary_arr.ndim) if any(step)]
+    return {frozenset((node, tuple(n + s for n, s in zip(node, step))))
+            for node in nodes for step in steps if tuple(n + s for n, s in zip(node, step)) in nodes}
+
+
+def edge_set(coordinates, edges):
+    coordinates = [tuple(node) for node in coordinates.tolist()]
+    return {frozenset((coordinates[u], coordinates[v])) for u, v in edges.tolist()}
+
+
+@pytest.mark.parametrize('shape', [(1, 1), (20, 20), (2, 2, 2), (5, 12, 12)])
+@pytest.mark.parametrize('fraction', [0.1, 0.3, 1.0])
+def test_edges_equal_neighborhood_edges(shape, fraction):
+    binary_arr = (np.random.default_rng(0).random(shape) < fraction).astype(np.uint8)
+    coordinates, edges = netGrArr.get_edges_from_array(binary_arr)
+    np.testing.assert_array_equal(coordinates, np.argwhere(binary_arr))
+    assert edges.dtype == np.int32
+    assert np.all(edges[:, 0] < edges[:, 1])
+    np.testing.assert_array_equal(edges, edges[np.lexsort((edges[:, 1], edges[:, 0]))])
+    assert edge_set(coordinates, edges) == neighborhood_edges(binary_arr)
+
+
+def reference_graph(binary_arr):
+    """
+        Returns the edges of the skeleton graph built with networkx as before the local triangle search: the longest
+        edges of the 3 vertex cliques are removed, of a clique with equal edge lengths the first edge within a plane
+        of the first axis is removed
+    """
+    graph = nx.Graph()
+    graph.add_edges_from(tuple(edge) for edge in neighborhood_edges(binary_arr))
+    cliqueEdges = []
+    for clique in nx.find_cliques_recursive(graph):
+        if len(clique) != 3:
+            continue
+        edges = list(itertools.combinations(clique, 2))
+        lengths = [sum((a - b) ** 2 for a, b in zip(u, v)) for u, v in edges]
+        if len(set(lengths)) != 1:
+            cliqueEdges += [edge for edge, length in zip(edges, lengths) if length == max(lengths)]
+        else:
+            cliqueEdges += [edge for edge in edges if edge[0][0] == edge[1][0]][:1]
+    graph.remove_edges_from(cliqueEdges)
+    return {frozenset(edge) for edge in graph.edges}
+
+
+def graph_edges(skeletonGraph):
+    return edge_set(skeletonGraph.coordinates, skeletonGraph.edges())
+
+
+FIXED_ARRAYS = [
+    # L shaped corner, the diagonal edge is removed
+    np.array([[1, 1],
+              [0, 1]]),
+    # full square, every triangle has a diagonal
+    np.ones((2, 2)),
+    # cross with four triangles at its center
+    np.array([[0, 1, 0],
+              [1, 1, 1],
+              [0, 1, 0]]),
+    # diagonal staircase
+    np.eye(5, dtype=int) + np.eye(5, k=1, dtype=int),
+    # triangle of equal edge lengths in 3D
+    np.array([[[1, 0], [0, 0]],
+              [[0, 1], [1, 0]]]),
+    # cube
+    np.ones((2, 2, 2)),
+    # two touching lines in 3D
+    np.array([[[1, 1, 1], [0, 0, 0], [0, 0, 0]],
+              [[0, 0, 0], [0, 1, 0], [0, 0, 0]],
+              [[0, 0, 0], [0, 0, 0], [1, 1, 1]]]),
+    # single voxel
+    np.ones((1, 1, 1)),
+]
+
+
+@pytest.mark.parametrize('binary_arr', FIXED_ARRAYS, ids=range(len(FIXED_ARRAYS)))
+def test_clique_removal_matches_networkx_on_fixed_arrays(binary_arr):
+    binary_arr = binary_arr.astype(np.uint8)
+    assert graph_edges(netGrArr.get_skeleton_graph_from_array(binary_arr)) == reference_graph(binary_arr)
+
+
+@pytest.mark.parametrize('shape', [(20, 20), (5, 12, 12)])
+@pytest.mark.parametrize('fraction', [0.1, 0.3, 0.6])
+def test_clique_removal_matches_networkx_on_random_arrays(shape, fraction):
+    binary_arr = (np.random.default_rng(3).random(shape) < fraction).astype(np.uint8)
+    assert graph_edges(netGrArr.get_skeleton_graph_from_array(binary_arr)) == reference_graph(binary_arr)
+
+
+def test_clique_removal_matches_networkx_on_skeleton(skeleton):
+    assert graph_edges(netGrArr.get_skeleton_graph_from_array(skeleton)) == reference_graph(skeleton)
+
+
+def assert_same_graph(graph, other):
+    np.testing.assert_array_equal(graph.coordinates, other.coordinates)
+    np.testing.assert_array_equal(graph.edges(), other.edges())
+    assert graph.shape == other.shape
+
+
+@pytest.mark.parametrize('shape, seed', [((24, 64, 64), 0), ((96, 96), 1), ((9, 40, 40), 2)])
+def test_sparse_edges_equal_dense_edges(shape, seed):
+    skeleton = make_skeleton(make_segmentation(shape, seed))
+    assert_same_graph(netGrArr.get_skeleton_graph_from_array(skeleton, sparse=True),
+                      netGrArr.get_skeleton_graph_from_array(skeleton, sparse=False))
+
+
+def test_sparse_edges_of_unsorted_coordinates(skeleton):
+    coordinates = np.argwhere(skeleton)
+    shuffled = coordinates[np.random.default_rng(0).permutation(len(coordinates))]
+    sortedCoordinates, edges = netGrArr.get_edges_from_coordinates(shuffled, skeleton.shape)
+    np.testing.assert_array_equal(sortedCoordinates, coordinates)
+    np.testing.assert_array_equal(edges, netGrArr.get_edges_from_array(skeleton)[1])
+
+
+@pytest.mark.parametrize('extension', ['tif', 'zarr'])
+@pytest.mark.parametrize('tileShape, workers', [(16, 1), ((7, 13, 64), 1), (20, 2)])
+def test_tiled_edges_equal_dense_edges(skeleton, tmp_path, extension, tileShape, workers):
+    path = str(tmp_path / ('Skeleton_test.' + extension))
+    utils.write_mask(skeleton, path)
+    assert_same_graph(netGrArr.get_skeleton_graph_from_file(path, tileShape, workers),
+                      netGrArr.get_skeleton_graph_from_array(skeleton))
+
+
+def test_tiled_edges_of_uint8_tiff(skeleton, tmp_path):
+    # a uint8 TIFF is memory-mapped instead of read through zarr
+    path = str(tmp_path / 'Skeleton_test.tif')
+    tifffile.imwrite(path, skeleton)
+    assert_same_graph(netGrArr.get_skeleton_graph_from_file(path, 16),
+                      netGrArr.get_skeleton_graph_from_array(skeleton))
+
+
+@pytest.mark.parametrize('tileShape, chunks, shape, expected', [
+    ((16, 16, 16), None, (40, 40, 40), (16, 16, 16)),
+    ((16, 16, 16), (8, 8, 8), (40, 40, 40), (16, 16, 16)),
+    # tiles of TIFF pages read through zarr cover whole pages and keep about the number of voxels of a tile
+    ((64, 64, 64), (1, 512, 512), (40, 512, 512), (1, 512, 512)),
+    ((256, 256, 256), (1, 512, 512), (400, 512, 512), (64, 512, 512)),
+    ((16, 16), (1, 100), (50, 100), (2, 100)),
+    ((16, 16, 16), (1, 64, 64), (24, 20, 20), (10, 20, 20)),
+])
+def test_chunk_aligned_tile_shape(tileShape, chunks, shape, expected):
+    assert netGrArr._get_chunk_aligned_tile_shape(tileShape, chunks, shape) == expected
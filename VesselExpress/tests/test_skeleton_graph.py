@@ -0,0 +1,37 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+import networkx_graph_from_array as netGrArr
+
+from conftest import make_skeleton
+
+
+@pytest.mark.parametrize('shape, seed', [((90, 90), 0), ((16, 50, 50), 1), ((16, 50, 50), 2)])
+def test_split_components_equal_networkx_components(shape, seed):
+    rng = np.random.default_rng(seed)
+    skeletonGraph = netGrArr.get_skeleton_graph_from_array(make_skeleton(rng.random(shape) < 0.35))
+    skeletonGraph.radii = rng.random(len(skeletonGraph)).astype(np.float32)
+    # edges removed in place change the components
+    skeletonGraph.remove_edge(*map(int, skeletonGraph.edges()[0]))
+    nodeIds = {node: i for i, node in enumerate(map(tuple, skeletonGraph.coordinates.tolist()))}
+    expected = sorted((sorted(component) for component in nx.connected_components(skeletonGraph.to_networkx())),
+                      key=lambda component: nodeIds[component[0]])
+
+    graphs, firstEndPoints = skeletonGraph.split_components()
+    assert len(graphs) == len(expected) > 1
+    for graph, first, component in zip(graphs, firstEndPoints.tolist(), expected):
+        assert list(map(tuple, graph.coordinates.tolist())) == component
+        # the graph of a component equals its subgraph and shares the arrays of all components
+        subgraph = skeletonGraph.subgraph([nodeIds[node] for node in component])
+        np.testing.assert_array_equal(graph.indptr, subgraph.indptr)
+        np.testing.assert_array_equal(graph.indices, subgraph.indices)
+        np.testing.assert_array_equal(graph.radii, subgraph.radii)
+        assert graph.coordinates.base is not None and graph.indices.base is not None
+        endPoints = np.flatnonzero(graph.degree == 1)
+        assert first == (endPoints[0] if len(endPoints) else -1)
+
+
+def test_split_empty_graph():
+    graphs, firstEndPoints = netGrArr.get_skeleton_graph_from_array(np.zeros((4, 4), dtype=np.uint8)).split_components()
+    assert graphs == [] and len(firstEndPoints) == 0
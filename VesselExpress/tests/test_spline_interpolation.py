@@ -0,0 +1,45 @@
+import math
+
+import numpy as np
+import pytest
+from geomdl import knotvector
+from scipy import interpolate
+
+import spline_interpolation as si
+
+
+def interpolate_segment(point_coords, vis_radius, spline_deg=3):
+    """
+        Returns the b-spline curve of a single segment evaluated with splev for every coordinate
+    """
+    num_verts = point_coords.shape[0]
+    spline_degree = spline_deg if num_verts > spline_deg + 1 else max(1, num_verts - 1)
+    delta = max(3, math.ceil(num_verts / math.log(num_verts, 2)))
+    if num_verts > 100 or (vis_radius > 3 and num_verts > 20):
+        delta = int(delta / 2)
+    u = np.linspace(0, 1, delta, endpoint=True)
+    knots = knotvector.generate(spline_degree, num_verts)
+    tck = [knots, list(point_coords.T.astype(np.float64)), spline_degree]
+    return np.array(interpolate.splev(u, tck)).T
+
+
+@pytest.mark.parametrize('ndim', [2, 3])
+@pytest.mark.parametrize('spline_deg', [1, 3, 5])
+def test_batch_interpolation_equals_single_segments(ndim, spline_deg):
+    rng = np.random.default_rng(ndim * spline_deg)
+    # many segments of the same sizes are interpolated together
+    numVerts = np.concatenate([rng.integers(2, 30, 200), rng.integers(2, 160, 20), [2, 3, 4, 5, 6, 101]])
+    offsets = np.concatenate([[0], np.cumsum(numVerts)])
+    coords = np.cumsum(rng.integers(-1, 2, (offsets[-1], ndim)), axis=0) + 50
+    radii = rng.uniform(0, 6, len(numVerts))
+    curveCoords, curveOffsets = si.interpolate_segments(coords, offsets, radii, spline_deg)
+    assert curveOffsets[-1] == len(curveCoords)
+    for i in range(len(numVerts)):
+        curve = interpolate_segment(coords[offsets[i]:offsets[i + 1]], radii[i], spline_deg)
+        np.testing.assert_array_equal(curveCoords[curveOffsets[i]:curveOffsets[i + 1]], curve)
+
+
+def test_no_segments():
+    curveCoords, curveOffsets = si.interpolate_segments(np.empty((0, 3)), np.zeros(1, dtype=np.int64), np.empty(0))
+    assert curveCoords.shape == (0, 3)
+    np.testing.assert_array_equal(curveOffsets, [0])
@@ -0,0 +1,82 @@
+import pytest
+
+import statistics_writer
+
+pa = pytest.importorskip('pyarrow')
+ds = pytest.importorskip('pyarrow.dataset')
+statistics_dataset = pytest.importorskip('statistics_dataset')
+
+SEGMENT = {'diameter': 2.5, 'straightness': 0.9, 'length': 7.25, 'volume': 35.5, 'branchingAngle': 'Null',
+           'terminal Points': 1, 'branching Points': 1}
+
+
+def write_statistics(path, imageFile, lengths, zAngle=False):
+    """
+        Writes the statistics of an image with one filament of a segment of each length
+    """
+    segments = {}
+    for i, length in enumerate(lengths):
+        segments[(0, 0, i), (0, 1, i)] = dict(SEGMENT, length=length, **({'zAngle': 30.0} if zAngle else {}))
+    with statistics_writer.StatisticsWriter(path, imageFile) as writer:
+        if segments:
+            writer.addFilament(0, segments, {'Segments': len(segments), 'TerminalPoints': 2, 'BranchPoints': 0}, {})
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    datasetPath = str(tmp_path / 'statistics_dataset')
+    images = [('a.tiff', 'hash1', [1.0, 2.0], False), ('b.tiff', 'hash1', [3.0], False),
+              ('a.tiff', 'hash2', [4.0, 5.0, 6.0], True), ('c.tiff', 'hash2', [], True)]
+    for imageFile, configHash, lengths, zAngle in images:
+        statsPath = str(tmp_path / (configHash + imageFile))
+        write_statistics(statsPath, imageFile, lengths, zAngle)
+        statistics_dataset.addImage(statsPath, datasetPath, imageFile, configHash)
+    return datasetPath
+
+
+def test_partition_filter_reads_only_matching_images(dataset):
+    table = statistics_dataset.readStatistics(dataset, 'Segment_Statistics', columns=['image_file', 'length'],
+                                              filter=ds.field('config_hash') == 'hash1')
+    assert sorted(zip(table['image_file'].to_pylist(), table['length'].to_pylist())) == [
+        ('a.tiff', 1.0), ('a.tiff', 2.0), ('b.tiff', 3.0)]
+    table = statistics_dataset.readStatistics(
+        dataset, 'Segment_Statistics', filter=(ds.field('image_file').isin(['a.tiff'])) & (ds.field('length') > 1.5))
+    assert sorted(zip(table['config_hash'].to_pylist(), table['length'].to_pylist())) == [
+        ('hash1', 2.0), ('hash2', 4.0), ('hash2', 5.0), ('hash2', 6.0)]
+
+
+def test_partition_filter_skips_files_of_other_partitions(dataset, tmp_path):
+    # the file of another configuration is not opened
+    (tmp_path / 'statistics_dataset' / 'Segment_Statistics' / 'config_hash=hash2' / 'image_file=a.tiff' /
+     'part-0.parquet').write_bytes(b'no parquet file')
+    table = statistics_dataset.readStatistics(dataset, 'Segment_Statistics',
+                                              filter=ds.field('config_hash') == 'hash1')
+    assert table.num_rows == 3
+
+
+def test_columns_of_other_configurations_are_null(dataset):
+    table = statistics_dataset.readStatistics(dataset, 'Segment_Statistics', columns=['config_hash', 'zAngle'])
+    assert sorted(zip(table['config_hash'].to_pylist(), table['zAngle'].to_pylist()),
+                  key=lambda row: (row[0], row[1] is None)) == [
+        ('hash1', None), ('hash1', None), ('hash1', None), ('hash2', 30.0), ('hash2', 30.0), ('hash2', 30.0)]
+    assert table.schema.field('zAngle').type == pa.float64()
+
+
+def test_image_without_segments(dataset):
+    table = statistics_dataset.readStatistics(dataset, 'Filament_Statistics',
+                                              filter=ds.field('image_file') == 'c.tiff')
+    assert table.num_rows == 0
+    assert statistics_dataset.readStatistics(dataset, 'Segment_Statistics',
+                                             filter=ds.field('image_file') == 'c.tiff').num_rows == 0
+
+
+def test_added_image_replaces_its_partitions(dataset, tmp_path):
+    write_statistics(str(tmp_path / 'new'), 'b.tiff', [7.0, 8.0])
+    statistics_dataset.addImage(str(tmp_path / 'new'), dataset, 'b.tiff', 'hash1')
+    table = statistics_dataset.readStatistics(dataset, 'Segment_Statistics', columns=['length'],
+                                              filter=ds.field('image_file') == 'b.tiff')
+    assert sorted(table['length'].to_pylist()) == [7.0, 8.0]
+    filaments = statistics_dataset.readStatistics(dataset, 'Filament_Statistics',
+                                                  filter=ds.field('image_file') == 'b.tiff')
+    assert filaments['No. Segments'].to_pylist() == [2]
+    assert filaments.schema.field('No. Segments').type == pa.int64()
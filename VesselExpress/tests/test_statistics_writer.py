@@ -0,0 +1,86 @@
+import csv
+import math
+
+import pytest
+
+import statistics_writer
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+SEGMENTS = {
+    ((0, 1, 2), (0, 5, 6)): {'diameter': 2.5, 'straightness': 0.9, 'length': 7.25, 'volume': 35.5,
+                             'branchingAngle': 'Null', 'terminal Points': 1, 'branching Points': 1},
+    ((0, 5, 6), (3, 5, 9)): {'diameter': 1.0, 'straightness': float('nan'), 'length': 4, 'volume': 3.14,
+                             'branchingAngle': 45.0005, 'terminal Points': 1, 'branching Points': 1},
+}
+FILAMENT = {'Segments': 2, 'TerminalPoints': 2, 'BranchPoints': 1}
+BRANCH_POINTS = {(0, 5, 6): 3}
+
+
+def read_csv(path):
+    with open(path, newline='') as file:
+        return list(csv.reader(file, delimiter=';'))
+
+
+def read_columnar(path, columnarFormat):
+    return pq.read_table(path) if columnarFormat == 'parquet' else pa.ipc.open_file(path).read_all()
+
+
+def assert_same_values(table, rows):
+    assert table.column_names == rows[0]
+    values = table.to_pylist()
+    assert len(values) == len(rows) - 1
+    for row, record in zip(rows[1:], values):
+        for name, value in zip(rows[0], row):
+            if record[name] is None:
+                assert value == 'Null'
+            elif isinstance(record[name], float):
+                assert (math.isnan(record[name]) and value == 'nan') or float(value) == record[name]
+            else:
+                assert str(record[name]) == value
+
+
+@pytest.mark.parametrize('columnarFormat', ['parquet', 'arrow'])
+@pytest.mark.parametrize('numFilaments', [0, 1, 5])
+def test_columnar_tables_equal_csv_tables(tmp_path, columnarFormat, numFilaments):
+    path = str(tmp_path / 'img')
+    with statistics_writer.StatisticsWriter(path, 'img', columnarFormat) as writer:
+        # a batch size of 3 rows writes several row groups or record batches
+        for table in (writer.segments, writer.filaments, writer.branches):
+            table.batchSize = 3
+        for filamentId in range(numFilaments):
+            writer.addFilament(filamentId, SEGMENTS, FILAMENT, BRANCH_POINTS)
+
+    for name in ('_Segment_Statistics', '_Filament_Statistics', '_BranchesPerBranchPt'):
+        rows = read_csv(path + name + '.csv')
+        table = read_columnar(path + name + '.' + columnarFormat, columnarFormat)
+        if numFilaments == 0 and name == '_Segment_Statistics':
+            # the columns of the segments are only known with the first segment
+            assert rows == [] and table.num_rows == 0
+            continue
+        assert len(rows) == numFilaments * (2 if name == '_Segment_Statistics' else 1) + 1
+        assert_same_values(table, rows)
+        for field in table.schema:
+            assert str(field.type) == {'string': 'string', 'int64': 'int64'}.get(
+                statistics_writer.COLUMN_TYPES.get(field.name), 'double')
+
+
+def test_csv_without_columnar_format(tmp_path):
+    path = str(tmp_path / 'img')
+    with statistics_writer.StatisticsWriter(path, 'img') as writer:
+        writer.addFilament(0, SEGMENTS, FILAMENT, BRANCH_POINTS)
+    assert read_csv(path + '_Filament_Statistics.csv') == [
+        ['Image', 'FilamentID', 'No. Segments', 'No. Terminal Points', 'No. Branching Points'],
+        ['img', '0', '2', '2', '1']]
+    assert read_csv(path + '_Segment_Statistics.csv')[1][:3] == ['img', '0', '((0, 1, 2), (0, 5, 6))']
+    assert not (tmp_path / 'img_Filament_Statistics.parquet').exists()
+
+
+@pytest.mark.parametrize('columnarFormat', ['parquet', 'arrow'])
+def test_value_not_fitting_column_type_raises(tmp_path, columnarFormat):
+    table = statistics_writer.StatisticsTable(str(tmp_path / 'table.csv'), columnarFormat)
+    table.writeHeader(['Image', 'FilamentID', 'length'])
+    table.writeRows([['img', 1.5, 2.0]])
+    with pytest.raises(pa.ArrowInvalid):
+        table.close()
@@ -0,0 +1,105 @@
+import dask.array as da
+import numpy as np
+import pytest
+import tifffile
+import zarr
+
+import utils
+
+
+@pytest.fixture(scope='module')
+def image():
+    return (np.random.default_rng(0).random((6, 20, 30)) * 255).astype(np.uint8)
+
+
+def test_read_uncompressed_tiff_memory_mapped(image, tmp_path):
+    path = str(tmp_path / 'img.tif')
+    tifffile.imwrite(path, image)
+    img = utils.read_img(path, lazy=True)
+    assert isinstance(img, np.memmap)
+    np.testing.assert_array_equal(img, image)
+
+
+def test_read_compressed_tiff_as_zarr_array(image, tmp_path):
+    # compressed image data can not be memory-mapped, it is read page by page through zarr instead
+    path = str(tmp_path / 'img.tiff')
+    tifffile.imwrite(path, image, compression='zlib')
+    img = utils.read_img(path, lazy=True)
+    assert isinstance(img, zarr.Array)
+    np.testing.assert_array_equal(img[2:4, 5:9], image[2:4, 5:9])
+    np.testing.assert_array_equal(utils.read_img(path), image)
+
+
+def test_read_zarr_store(image, tmp_path):
+    path = str(tmp_path / 'img.zarr')
+    zarr.open(path, mode='w', shape=image.shape, dtype=image.dtype, chunks=(2, 10, 10))[...] = image
+    assert isinstance(utils.read_img(path, lazy=True), zarr.Array)
+    img = utils.read_img(path)
+    assert isinstance(img, np.ndarray)
+    np.testing.assert_array_equal(img, image)
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_read_as_other_dtype(image, tmp_path, lazy):
+    path = str(tmp_path / 'img.tif')
+    tifffile.imwrite(path, image)
+    mask = utils.read_img(path, lazy=lazy, dtype=bool)
+    assert type(mask) is np.ndarray and mask.dtype == bool
+    np.testing.assert_array_equal(mask, image != 0)
+    # an image of the requested type is not converted
+    assert isinstance(utils.read_img(path, lazy=True, dtype=np.uint8), np.memmap)
+
+
+@pytest.fixture(scope='module')
+def mask(image):
+    return image > 127
+
+
+def test_write_mask_tiff_bilevel(mask, tmp_path):
+    path = str(tmp_path / 'mask.tif')
+    utils.write_mask(mask, path)
+    with tifffile.TiffFile(path) as tif:
+        assert tif.pages[0].bitspersample == 1
+    img = utils.read_img(path, dtype=bool)
+    assert img.dtype == bool
+    np.testing.assert_array_equal(img, mask)
+
+
+def test_write_mask_ome_tiff(mask, tmp_path):
+    path = str(tmp_path / 'mask.tif')
+    utils.write_mask(mask, path, axes='ZYX')
+    with tifffile.TiffFile(path) as tif:
+        assert tif.is_ome
+        assert tif.series[0].axes == 'ZYX'
+        assert tif.pages[0].bitspersample == 1
+    np.testing.assert_array_equal(utils.read_img(path, lazy=True, dtype=bool), mask)
+
+
+def test_write_mask_tiff_from_dask_array(mask, tmp_path):
+    path = str(tmp_path / 'mask.tif')
+    utils.write_mask(da.from_array(mask, chunks=(2, 7, 11)), path, axes='ZYX')
+    np.testing.assert_array_equal(utils.read_img(path, dtype=bool), mask)
+
+
+def test_write_mask_png(mask, tmp_path):
+    path = str(tmp_path / 'mask.png')
+    utils.write_mask(mask[0], path)
+    np.testing.assert_array_equal(utils.read_img(path), mask[0].astype(np.uint8) * 255)
+    np.testing.assert_array_equal(utils.read_img(path, dtype=bool), mask[0])
+
+
+@pytest.mark.parametrize('asDask', [False, True])
+def test_write_mask_zarr(tmp_path, asDask):
+    mask = np.random.default_rng(1).random((3, 130, 140)) > 0.5
+    # uint8 masks with 0 and 255 are written as bool like the masks of the segmentations
+    written = mask.astype(np.uint8) * 255
+    if asDask:
+        written = da.from_array(written, chunks=(2, 50, 70))
+    path = str(tmp_path / 'mask.zarr')
+    utils.write_mask(written, path)
+    # the stores are written in the zarr v2 format, which zarr 2 and 3 can read
+    assert (tmp_path / 'mask.zarr' / '.zarray').exists()
+    store = utils.read_img(path, lazy=True)
+    assert store.dtype == bool
+    assert store.chunks == (3, 128, 128)
+    np.testing.assert_array_equal(utils.read_img(path), mask)
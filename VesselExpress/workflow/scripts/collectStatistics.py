@@ -0,0 +1,28 @@
+import time
+import argparse
+import sys
+import os
+
+# import modules
+package = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'modules/'))
+sys.path.append(package)
+
+import statistics_dataset
+
+
+if __name__ == '__main__':
+    programStart = time.time()
+
+    parser = argparse.ArgumentParser(description='Adds the statistics of an image to the partitioned statistics '
+                                                 'dataset of all images')
+    parser.add_argument('-stats', type=str, help='prefix of the statistics csv files of the image, e.g. data/img.tiff')
+    parser.add_argument('-dataset', type=str, help='directory of the statistics dataset')
+    parser.add_argument('-config_hash', type=str, help='hash of the configuration of the statistics')
+    parser.add_argument('-prints', type=bool, default=False, help='set to True to print runtime')
+    args = parser.parse_args()
+
+    statsPath = os.path.abspath(args.stats).replace('\\', '/')
+    statistics_dataset.addImage(statsPath, args.dataset, os.path.basename(statsPath), args.config_hash)
+
+    if args.prints:
+        print("Statistics collection completed in %0.3f seconds" % (time.time() - programStart))
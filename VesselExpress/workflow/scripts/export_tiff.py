@@ -0,0 +1,25 @@
+import time
+import argparse
+import sys
+import os
+
+# import modules
+package = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'modules/'))
+sys.path.append(package)
+
+import utils
+
+
+if __name__ == '__main__':
+    programStart = time.time()
+
+    parser = argparse.ArgumentParser(description='Exports a binary image from a zarr store to a tif image file')
+    parser.add_argument('-i', type=str, help='input zarr store')
+    parser.add_argument('-o', type=str, help='output tif image file')
+    parser.add_argument('-prints', type=bool, default=False, help='set to True to print runtime')
+    args = parser.parse_args()
+
+    utils.write_mask(utils.read_img(args.i, dtype=bool), args.o)
+
+    if args.prints:
+        print("Export completed in %0.3f seconds" % (time.time() - programStart))
@@ -1,6 +1,8 @@
 import time
 import numpy as np
 import argparse
+import itertools
+import multiprocessing
 import networkx as nx
 import sys
 import os
@@ -13,6 +15,68 @@ sys.path.append(package)
 import networkx_graph_from_array as netGrArr
 import graph
 import utils
+import statistics_writer
+
+# postprocessing parameters which can be swept without rebuilding the graph
+SWEEP_PARAMETERS = ['pruning_scale', 'length_limit', 'dia_scale', 'cut_neighbor_brpt_segs']
+
+# skeleton graph with radii and file name of a sweep worker process, set once by _init_sweep_worker
+_sweepArgs = None
+
+
+def _graphFromFile(parameterDict):
+    return bool(parameterDict.get("graph_tile_size") or parameterDict.get("small_RAM_mode"))
+
+
+def readImages(skelImg, binImg, parameterDict):
+    # the binary image is only used as mask of its nonzero voxels/pixels, an uint8 or bool image is kept as read-only
+    # view of the file (memory-mapped or read chunk by chunk), other types are read as bool mask
+    binImage = utils.read_img(binImg, lazy=True)
+    # compressed and 1-bit TIFF files can only be read page by page, the distance transform reads a box around every
+    # tile of skeleton voxels and would decode the same pages again for each box, so they are read at once unless
+    # small RAM mode restricts the memory (the interchange format zarr avoids this)
+    pageChunked = hasattr(binImage, 'chunks') and not binImg.rstrip(os.sep).endswith('.zarr')
+    if binImage.dtype not in (np.uint8, np.bool_) or (pageChunked and parameterDict.get("small_RAM_mode") != 1):
+        binImage = utils.read_img(binImg, dtype=bool)
+    if _graphFromFile(parameterDict):
+        # the graph is built from the skeleton file, only the shape of the skeleton is used
+        skeleton = utils.read_img(skelImg, lazy=True)
+    else:
+        skeleton = utils.read_img(skelImg, dtype=bool)
+    return binImage, skeleton
+
+
+def buildSkeletonGraph(skelImg, skeleton, parameterDict):
+    if _graphFromFile(parameterDict):
+        # read the skeleton file tile by tile, small RAM mode uses tiles of 256 voxels/pixels per axis by default
+        return netGrArr.get_skeleton_graph_from_file(skelImg, parameterDict.get("graph_tile_size") or 256,
+                                                     workers=parameterDict.get("num_workers", 1))
+    return netGrArr.get_skeleton_graph_from_array(skeleton, sparse=parameterDict.get("sparse_graph") == 1)
+
+
+def analyseGraph(binImage, skeleton, skeletonGraph, parameterDict, file_name, statsPath, finfo=None):
+    # the segment, filament and branches statistics are written to one table per category while they are computed
+    columnarFormat = parameterDict.get("columnar_format", "none")
+    with statistics_writer.StatisticsWriter(statsPath, file_name,
+                                            None if columnarFormat == "none" else columnarFormat) as writer:
+        stats = graph.Graph(binImage, skeleton, skeletonGraph, parameterDict.get("pixel_dimensions"),
+                            pruningScale=parameterDict.get("pruning_scale"),
+                            lengthLimit=parameterDict.get("length_limit"), diaScale=parameterDict.get("dia_scale"),
+                            branchingThreshold=parameterDict.get("branching_threshold"),
+                            expFlag=parameterDict.get("experimental_flag"), infoFile=finfo,
+                            graphCreation=parameterDict.get("extended_output"),
+                            smallRAMmode=parameterDict.get("small_RAM_mode"), fileName=file_name,
+                            removeBorderEndPts=parameterDict.get("remove_border_end_pts"),
+                            removeEndPtsFromSmallFilaments=parameterDict.get("remove_end_pts_from_small_filaments"),
+                            interpolate=parameterDict.get("seg_interpolate"),
+                            splineDegree=parameterDict.get("spline_degree"),
+                            cut_neighbor_brpt_segs=parameterDict.get("cut_neighbor_brpt_segs"),
+                            numWorkers=parameterDict.get("num_workers", 1),
+                            edtMode=parameterDict.get("edt_mode", "two_pass"),
+                            maxRadius=parameterDict.get("max_radius", 15),
+                            iterativePruning=parameterDict.get("iterative_pruning", 0), statsWriter=writer)
+        stats.setStats()
+    return stats
 
 
 def processImage(skelImg, binImg, parameterDict):
@@ -25,32 +89,18 @@ def processImage(skelImg, binImg, parameterDict):
     #finfo = dir + '/' + file_name + '_info.csv'
 
     # Graph construction
-    binImage = utils.read_img(binImg)
-    binImage = binImage / np.max(binImage)
-    skeleton = utils.read_img(skelImg)
-    if np.max(skeleton) != 0:   # only if skeleton points are present
-        skeleton = skeleton / np.max(skeleton)
-
-    networkxGraph = netGrArr.get_networkx_graph_from_array(skeleton)
+    binImage, skeleton = readImages(skelImg, binImg, parameterDict)
+    skeletonGraph = buildSkeletonGraph(skelImg, skeleton, parameterDict)
 
     # Statistical Analysis
-    stats = graph.Graph(binImage, skeleton, networkxGraph, parameterDict.get("pixel_dimensions"),
-                        pruningScale=parameterDict.get("pruning_scale"), lengthLimit=parameterDict.get("length_limit"),
-                        diaScale=parameterDict.get("dia_scale"), branchingThreshold=parameterDict.get("branching_threshold"),
-                        expFlag=parameterDict.get("experimental_flag"), infoFile=finfo,
-                        graphCreation=parameterDict.get("extended_output"), smallRAMmode=parameterDict.get("small_RAM_mode"),
-                        fileName=file_name, removeBorderEndPts=parameterDict.get("remove_border_end_pts"),
-                        removeEndPtsFromSmallFilaments=parameterDict.get("remove_end_pts_from_small_filaments"),
-                        interpolate=parameterDict.get("seg_interpolate"), splineDegree=parameterDict.get("spline_degree"),
-                        cut_neighbor_brpt_segs=parameterDict.get("cut_neighbor_brpt_segs"))
-    stats.setStats()
+    stats = analyseGraph(binImage, skeleton, skeletonGraph, parameterDict, file_name,
+                         dir + '.' + input_file.split('.')[1], finfo)
 
     if parameterDict.get("extended_output") == 1:
         # save graph as image and graphml file
         graph_arr = stats.skeleton
-        utils.write_img((graph_arr * 255).astype('uint8'), dir + '/Graph_' + file_name + '.'
-                        + input_file.split('.')[1])
-        g = stats.networkxGraph
+        utils.write_mask(graph_arr, dir + '/Graph_' + file_name + '.' + input_file.split('.')[1])
+        g = stats.skeletonGraph.to_networkx()
         nx.write_graphml_lxml(g, dir + '/' + file_name + ".graphml")
 
         # save image with branch points
@@ -59,22 +109,20 @@ def processImage(skelImg, binImg, parameterDict):
             if i.keys():
                 for k in i.keys():
                     brPts.append(k)
-        brPt_img = np.zeros(graph_arr.shape)
+        brPt_img = np.zeros(graph_arr.shape, dtype=bool)
         for ind in brPts:
-            brPt_img[ind] = 255
-        utils.write_img(brPt_img.astype('uint8'), dir + '/BrPts_' + file_name + '.'
-                        + input_file.split('.')[1])
+            brPt_img[ind] = True
+        utils.write_mask(brPt_img, dir + '/BrPts_' + file_name + '.' + input_file.split('.')[1])
 
         # save image with terminal points
         endPts = []
         for i in stats.endPointsDict.values():
             for l in i:
                 endPts.append(l)
-        endPt_img = np.zeros(graph_arr.shape)
+        endPt_img = np.zeros(graph_arr.shape, dtype=bool)
         for ind in endPts:
-            endPt_img[ind] = 255
-        utils.write_img(endPt_img.astype('uint8'), dir + '/EndPts_' + file_name + '.'
-                        + input_file.split('.')[1])
+            endPt_img[ind] = True
+        utils.write_mask(endPt_img, dir + '/EndPts_' + file_name + '.' + input_file.split('.')[1])
 
     # Export statistics to csv files
     # os.makedirs(statsDir, exist_ok=True)
@@ -98,10 +146,7 @@ def processImage(skelImg, binImg, parameterDict):
     # utils.saveBranchPtDictAsCSV(stats.branchPointsDict, os.path.join(statsDir, file_name + '_BranchPt_No._Branches.csv'),
     #                                  'BranchPt No. Branches', category='Branch')
 
-    # create files containing all statisics in one csv per category (segment, filament, branches and endPtsRatio)
-    utils.saveAllStatsAsCSV(stats.segStatsDict, dir + '.' + input_file.split('.')[1] + '_Segment_Statistics.csv', file_name)
-    utils.saveAllFilStatsAsCSV(stats.filStatsDict, dir + '.' + input_file.split('.')[1] + '_Filament_Statistics.csv', file_name)
-    utils.saveBranchesBrPtAsCSV(stats.branchesBrPtDict, dir + '.' + input_file.split('.')[1] + '_BranchesPerBranchPt.csv', file_name)
+    # the files containing all statisics per category (segment, filament and branches) are written by analyseGraph
     if parameterDict.get("experimental_flag") == 1:
         statsDir = os.path.join(dir, 'statistics')
         os.makedirs(statsDir, exist_ok=True)
@@ -113,6 +158,75 @@ def processImage(skelImg, binImg, parameterDict):
         rmtree('tmp_zarr' + os.sep + file_name + '_radiusMatrix.zarr')
 
 
+def _init_sweep_worker(sweepArgs):
+    global _sweepArgs
+    _sweepArgs = sweepArgs
+
+
+def _sweep_worker(task):
+    parameters, path = task
+    skeletonGraph, file_name = _sweepArgs
+    analyseGraph(None, None, skeletonGraph, parameters, file_name, path)
+
+
+def sweepParameters(skelImg, binImg, parameterDict, sweepDict):
+    """
+    Computes the statistics for every combination of the swept postprocessing parameters. The images are read, the
+    graph is built and the radii are computed once, then the parameter sets are evaluated in num_workers processes.
+    The segment, filament and branch statistics of parameter set i are written to <image dir>/sweep/set_i_*.csv and
+    the values of all parameter sets to <image dir>/sweep/Sweep_Parameters.csv, no other outputs are written.
+
+    Parameters
+    ----------
+    parameterDict : dict
+        parameters of processImage, the swept parameters are replaced by the values of each parameter set
+
+    sweepDict : dict
+        list of values for each swept parameter of SWEEP_PARAMETERS
+    """
+    input_file = os.path.abspath(skelImg).replace('\\', '/')
+    dir = os.path.dirname(input_file)
+    file_name = os.path.basename(dir)
+    numWorkers = parameterDict.get("num_workers", 1)
+
+    binImage, skeleton = readImages(skelImg, binImg, parameterDict)
+    skeletonGraph = buildSkeletonGraph(skelImg, skeleton, parameterDict)
+    skeletonGraph.radii = graph.computeRadii(binImage, skeletonGraph, parameterDict.get("pixel_dimensions"),
+                                             parameterDict.get("small_RAM_mode"), file_name,
+                                             parameterDict.get("edt_mode", "two_pass"),
+                                             parameterDict.get("max_radius", 15), numWorkers)
+    # the parameter sets only need the skeleton graph, which holds the shape of the skeleton
+    del binImage, skeleton
+    if parameterDict.get('small_RAM_mode'):
+        rmtree('tmp_zarr' + os.sep + file_name + '_radiusMatrix.zarr')
+
+    names = [name for name in SWEEP_PARAMETERS if name in sweepDict]
+    parameterSets = [dict(parameterDict, **dict(zip(names, values)))
+                     for values in itertools.product(*[sweepDict[name] for name in names])]
+    sweepDir = os.path.join(dir, 'sweep')
+    os.makedirs(sweepDir, exist_ok=True)
+    utils.saveSweepParametersAsCSV(parameterSets, names, os.path.join(sweepDir, 'Sweep_Parameters.csv'))
+
+    # parameter sets run in parallel, so the filaments of one set are computed in a single process
+    tasks = [(dict(parameters, num_workers=1, extended_output=0, experimental_flag=0),
+              os.path.join(sweepDir, 'set_' + str(idx))) for idx, parameters in enumerate(parameterSets)]
+    sweepArgs = (skeletonGraph, file_name)
+    if numWorkers > 1 and len(tasks) > 1:
+        # spawn the workers in small RAM mode, forking after dask started its thread pools can deadlock them
+        context = multiprocessing.get_context('spawn' if parameterDict.get('small_RAM_mode') == 1 else None)
+        with context.Pool(min(numWorkers, len(tasks)), initializer=_init_sweep_worker,
+                          initargs=(sweepArgs,)) as pool:
+            pool.map(_sweep_worker, tasks)
+    else:
+        _init_sweep_worker(sweepArgs)
+        for task in tasks:
+            _sweep_worker(task)
+
+
+def _parse_values(values, dtype):
+    return [dtype(item) for item in values.split(',')]
+
+
 if __name__ == '__main__':
     programStart = time.time()
 
@@ -141,6 +255,29 @@ if __name__ == '__main__':
     parser.add_argument('-cut_neighbor_brpt_segs', type=int, default=1, help='set to 0 to not cut segments which '
                                                                              'consists of 2 neighboring branch points')
     parser.add_argument('-small_RAM_mode', type=int, default=0, help='set to 1 for small RAM mode')
+    parser.add_argument('-sparse_graph', type=int, default=1, help='set to 0 to build the graph by comparing the whole '
+                                                                   'skeleton image instead of its coordinate list')
+    parser.add_argument('-graph_tile_size', type=int, default=0, help='edge length of the tiles the skeleton is read '
+                                                                      'in for graph construction, 0 reads it at once')
+    parser.add_argument('-num_workers', type=int, default=1, help='number of worker processes for graph construction '
+                                                                  'and filament statistics')
+    parser.add_argument('-edt_mode', type=str, default='two_pass', choices=['exact', 'tiled', 'two_pass'],
+                        help='distance transform of the whole image (exact), of tiles overlapping by max_radius '
+                             '(tiled) or of tiles which are recomputed if a radius exceeds the overlap (two_pass)')
+    parser.add_argument('-max_radius', type=float, default=15, help='maximum expected vessel radius in the unit of '
+                                                                    'the pixel dimensions')
+    parser.add_argument('-iterative_pruning', type=int, default=0, help='set to 1 to prune branches until no branch '
+                                                                        'fulfils the pruning criterion')
+    parser.add_argument('-columnar_format', type=str, default='none', choices=['none', 'parquet', 'arrow'],
+                        help='write the statistics as parquet or arrow ipc file with typed columns alongside the csv '
+                             'files, needs pyarrow')
+    parser.add_argument('-sweep_pruning_scale', type=str, default=None,
+                        help='comma separated pruning scales, if any sweep parameter is set the statistics are '
+                             'computed for every combination of the swept values instead of the single values')
+    parser.add_argument('-sweep_length_limit', type=str, default=None, help='comma separated length limits to sweep')
+    parser.add_argument('-sweep_dia_scale', type=str, default=None, help='comma separated diameter scales to sweep')
+    parser.add_argument('-sweep_cut_neighbor_brpt_segs', type=str, default=None,
+                        help='comma separated values of cut_neighbor_brpt_segs to sweep, e.g. 0,1')
     parser.add_argument('-prints', type=bool, default=False, help='set to True to print runtime')
     args = parser.parse_args()
 
@@ -161,10 +298,29 @@ if __name__ == '__main__':
         "seg_interpolate": args.seg_interpolate,
         "spline_degree": args.spline_degree,
         "cut_neighbor_brpt_segs": args.cut_neighbor_brpt_segs,
-        "small_RAM_mode": args.small_RAM_mode
+        "small_RAM_mode": args.small_RAM_mode,
+        "sparse_graph": args.sparse_graph,
+        "graph_tile_size": args.graph_tile_size,
+        "num_workers": args.num_workers,
+        "edt_mode": args.edt_mode,
+        "max_radius": args.max_radius,
+        "iterative_pruning": args.iterative_pruning,
+        "columnar_format": args.columnar_format
+    }
+
+    sweep = {
+        "pruning_scale": args.sweep_pruning_scale and _parse_values(args.sweep_pruning_scale, float),
+        "length_limit": args.sweep_length_limit and _parse_values(args.sweep_length_limit, float),
+        "dia_scale": args.sweep_dia_scale and _parse_values(args.sweep_dia_scale, float),
+        "cut_neighbor_brpt_segs": args.sweep_cut_neighbor_brpt_segs and
+                                  _parse_values(args.sweep_cut_neighbor_brpt_segs, int)
     }
+    sweep = {name: values for name, values in sweep.items() if values}
 
-    processImage(args.skel_img, args.bin_img, parameters)
+    if sweep:
+        sweepParameters(args.skel_img, args.bin_img, parameters, sweep)
+    else:
+        processImage(args.skel_img, args.bin_img, parameters)
 
     if args.prints:
         print("Graph extraction and statistical analysis completed in %0.3f seconds" % (time.time() - programStart))
@@ -40,6 +40,8 @@ if __name__ == '__main__':
     parser.add_argument('-block_size', type=int, default=137, help='block size for local thresholding, '
                                                                    '0 for global thresholding')
     parser.add_argument('-plot', type=int, default=0, help='set to 1 for plotting')
+    parser.add_argument('-interchange_format', type=str, default='tiff', choices=['tiff', 'zarr'],
+                        help='format of the binary image, zarr writes a chunked and compressed store <image path>.zarr')
     parser.add_argument('-prints', type=bool, default=False, help='set to True to print runtime')
     args = parser.parse_args()
 
@@ -116,8 +118,10 @@ if __name__ == '__main__':
     #     plt.title('Binary closing and artifact removal')
     #     plt.show()
 
-    utils.write_img((binImage * 255).astype('uint8'), output_dir + '/Binary_' + os.path.basename(output_dir) + '.'
-                    + input_file.split('.')[1])
+    output = output_dir + '/Binary_' + os.path.basename(output_dir) + '.' + input_file.split('.')[1]
+    if args.interchange_format == 'zarr':
+        output = output + '.zarr'
+    utils.write_mask(binImage, output)
 
     if args.prints:
         print("Segmentation completed in %0.3f seconds" % (time.time() - programStart))
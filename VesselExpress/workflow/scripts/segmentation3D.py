@@ -3,10 +3,9 @@ from numpy import array
 from importlib import import_module
 from skimage.morphology import remove_small_objects, binary_closing, cube
 from aicsimageio import AICSImage
-from aicsimageio.writers import OmeTiffWriter
 from aicssegmentation.core.utils import topology_preserving_thinning
 from aicssegmentation.core.pre_processing_utils import edge_preserving_smoothing_3d
-from tifffile import imread, imsave
+from tifffile import imread
 import time
 import argparse
 from pathlib import Path
@@ -20,6 +19,13 @@ from dask.array import logical_or
 from dask_image import ndmeasure, ndmorph
 from functools import partial
 from shutil import rmtree
+import sys
+
+# import modules
+package = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'modules/'))
+sys.path.append(package)
+
+import utils
 
 
 def vesselness_filter(
@@ -289,10 +295,7 @@ def segmentation(input, output, cfg):
 
         # generate the final segmentation as TIFF image
         final_segmentation = da.from_zarr(latest_seg_path)
-        im_out = final_segmentation.compute()
-        im_out = im_out.astype(np.uint8)
-        im_out[im_out > 0] = 255
-        OmeTiffWriter.save(im_out, output, dim_order="ZYX")
+        utils.write_mask(final_segmentation, output, axes="ZYX")
 
         # remove tmp folder
         rmtree(tmp_path)
@@ -332,10 +335,7 @@ def segmentation(input, output, cfg):
         if cfg["post_cleaning"] != 0:
             seg = remove_small_objects(seg, min_size=cfg["post_cleaning"])
 
-        seg = seg.astype(np.uint8)
-        seg[seg > 0] = 255
-
-        imsave(output, seg)
+        utils.write_mask(seg, output, axes="ZYX")
 
 
 if __name__ == '__main__':
@@ -374,6 +374,8 @@ if __name__ == '__main__':
     parser.add_argument('-min_thickness', type=int, default=None)
     parser.add_argument('-thin', type=int, default=None)
     parser.add_argument('-post_cleaning', type=int, default=100, help='set to 0 for no cleaning')
+    parser.add_argument('-interchange_format', type=str, default='tiff', choices=['tiff', 'zarr'],
+                        help='format of the binary image, zarr writes a chunked and compressed store <tif path>.zarr')
     args = parser.parse_args()
 
     config = {
@@ -398,8 +400,10 @@ if __name__ == '__main__':
     input_file = os.path.abspath(args.input).replace('\\', '/')
     output_dir = os.path.dirname(input_file)
 
-    segmentation(args.input, output_dir + '/Binary_' + os.path.basename(output_dir) + '.' + input_file.split('.')[1],
-                 config)
+    output = output_dir + '/Binary_' + os.path.basename(output_dir) + '.' + input_file.split('.')[1]
+    if args.interchange_format == 'zarr':
+        output = output + '.zarr'
+    segmentation(args.input, output, config)
 
     if args.prints:
         print("Segmentation completed in %0.3f seconds" % (time.time() - programStart))
@@ -22,14 +22,17 @@ if __name__ == '__main__':
     args = parser.parse_args()
 
     pixelDims = [float(item) for item in args.pixel_dimensions.split(',')]
-    input_file = os.path.abspath(args.i).replace('\\', '/')
+    input_file = os.path.abspath(args.i).replace('\\', '/').rstrip('/')
     output_dir = os.path.dirname(input_file)
-    binArr = utils.read_img(args.i)
+    binArr = utils.read_img(args.i, dtype=bool)
 
     skel = skeletonize(binArr, method='lee')
 
-    utils.write_img(skel.astype('uint8'), output_dir + '/Skeleton_' + os.path.basename(output_dir) + '.'
-                    + input_file.split('.')[1])
+    # the skeleton is written in the format of the binary image, <tif path>.zarr for zarr stores
+    output = output_dir + '/Skeleton_' + os.path.basename(output_dir) + '.' + input_file.split('.')[1]
+    if input_file.endswith('.zarr'):
+        output = output + '.zarr'
+    utils.write_mask(skel, output)
 
     if args.prints:
         print("Skeletonization completed in %0.3f seconds" % (time.time() - programStart))